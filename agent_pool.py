@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+AGENT_POOL_MAX_IDLE = int(os.getenv("AGENT_POOL_MAX_IDLE", 4))
+
+
+class AgentPool:
+    """Build agent teams once and hand out reset instances.
+
+    `factory` returns a dict of agents (and group chats) that make up one team.
+    checkout() yields an idle team, or builds a new one when every team is busy,
+    so concurrent calls never share conversation state. On return each member
+    is reset(), which clears message history, auto-reply counters and group
+    chat messages, and the team goes back on the idle list.
+    """
+
+    def __init__(self, name, factory, max_idle=AGENT_POOL_MAX_IDLE):
+        self.name = name
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.built = 0
+        self.reused = 0
+        self.build_seconds = 0.0
+        self.reset_seconds = 0.0
+
+    def _build(self):
+        start = time.perf_counter()
+        team = self.factory()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.built += 1
+            self.build_seconds += elapsed
+        return team
+
+    def _reset(self, team):
+        start = time.perf_counter()
+        for member in team.values():
+            member.reset()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.reset_seconds += elapsed
+            if len(self._idle) < self.max_idle:
+                self._idle.append(team)
+
+    @contextmanager
+    def checkout(self):
+        with self._lock:
+            team = self._idle.pop() if self._idle else None
+            if team is not None:
+                self.reused += 1
+        if team is None:
+            team = self._build()
+        try:
+            yield team
+        finally:
+            self._reset(team)
+
+    def stats(self):
+        with self._lock:
+            resets = self.built + self.reused
+            return {
+                "name": self.name,
+                "built": self.built,
+                "reused": self.reused,
+                "idle": len(self._idle),
+                "avg_build_seconds": self.build_seconds / self.built if self.built else 0.0,
+                "avg_reset_seconds": self.reset_seconds / resets if resets else 0.0,
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"Agent pool {s['name']}: {s['built']} built / {s['reused']} reused, "
+                f"{s['avg_build_seconds'] * 1000:.0f} ms avg build, {s['avg_reset_seconds'] * 1000:.0f} ms avg reset")
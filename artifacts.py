@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+from diskcache import Cache, JSONDisk
+from cache import CACHE_DIR, content_key
+
+# compressed on-disk store; empty keeps artifacts in memory only
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(CACHE_DIR, "artifacts"))
+ARTIFACT_STORE_SIZE = int(os.getenv("ARTIFACT_STORE_SIZE", 512 * 1024 * 1024))
+# hot artifacts kept decoded in memory
+ARTIFACT_MEMORY_ITEMS = int(os.getenv("ARTIFACT_MEMORY_ITEMS", 256))
+# characters read_artifact returns per call
+ARTIFACT_READ_CHARS = int(os.getenv("ARTIFACT_READ_CHARS", 4000))
+
+
+def artifact_text(payload):
+    """The readable text of an artifact: research material, page or draft text, or the string itself."""
+    if isinstance(payload, str):
+        return payload
+    if "findings" in payload:
+        # imported here: results is a leaf module, but keep artifacts importable on its own
+        from results import ResearchResult
+        return ResearchResult.from_dict(payload).material()
+    return payload.get("text", "")
+
+
+class ArtifactStore:
+    """Results that agents pass to each other by ID instead of copying them into prompts.
+
+    IDs are content-addressed, so storing the same result twice yields the same
+    ID and one copy. Payloads are JSON, zlib-compressed on disk (diskcache, LRU
+    eviction past `size_limit`), so IDs stay valid across processes and runs;
+    the `memory_items` most recently used are also kept decoded in memory.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR, size_limit=ARTIFACT_STORE_SIZE, memory_items=ARTIFACT_MEMORY_ITEMS):
+        self.memory_items = memory_items
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = Cache(directory, disk=JSONDisk, disk_compress_level=6, size_limit=size_limit,
+                           eviction_policy="least-recently-used") if directory else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def artifact_id(kind, payload):
+        return f"{kind}-" + content_key(kind, payload).split(":", 1)[1][:16]
+
+    def _remember(self, artifact_id, payload):
+        with self._lock:
+            self._hot[artifact_id] = payload
+            self._hot.move_to_end(artifact_id)
+            # without a disk store memory is the only copy, so nothing is evicted
+            while self._disk is not None and len(self._hot) > self.memory_items:
+                self._hot.popitem(last=False)
+
+    def put(self, kind, payload):
+        artifact_id = self.artifact_id(kind, payload)
+        if self._disk is not None:
+            # content-addressed: an existing entry already holds this payload
+            self._disk.add(artifact_id, payload)
+        self._remember(artifact_id, payload)
+        return artifact_id
+
+    def get(self, artifact_id):
+        artifact_id = artifact_id.strip()
+        with self._lock:
+            payload = self._hot.get(artifact_id)
+            if payload is not None:
+                self._hot.move_to_end(artifact_id)
+                self.memory_hits += 1
+                return payload
+        payload = self._disk.get(artifact_id) if self._disk is not None else None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(artifact_id, payload)
+        return payload
+
+    def read(self, artifact_id, start=0, length=ARTIFACT_READ_CHARS):
+        """A slice of an artifact's text, with its position, or None for an unknown ID."""
+        payload = self.get(artifact_id)
+        if payload is None:
+            return None
+        text = artifact_text(payload)
+        start = max(0, int(start))
+        end = min(len(text), start + max(1, int(length)))
+        part = f"[{artifact_id}: characters {start}-{end} of {len(text)}]\n{text[start:end]}"
+        if end < len(text):
+            part += f"\n[{len(text) - end} more characters: read_artifact('{artifact_id}', start={end})]"
+        return part
+
+    def stats(self):
+        with self._lock:
+            stats = {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                     "misses": self.misses, "hot": len(self._hot)}
+        if self._disk is not None:
+            stats.update(entries=len(self._disk), bytes=self._disk.volume())
+        return stats
+
+    def report(self):
+        s = self.stats()
+        line = f"Artifacts: {s['memory_hits']} memory / {s['disk_hits']} disk hits, {s['misses']} misses"
+        if "entries" in s:
+            line += f", {s['entries']} stored in {s['bytes'] / 1024:.0f} KiB"
+        return line
+
+
+artifacts = ArtifactStore()
@@ -0,0 +1,152 @@
+"""Run many briefs through the agency without prompts.
+
+Usage:
+    python batch.py briefs.jsonl --workers 4 --out runs
+
+Each line of the JSONL file is an object with "brand" and "brief" (or
+"brand_task" / "user_task") and an optional "id". Every brief runs in its own
+worker process and gets its own directory holding stdout.log,
+transcript.json, transcript.md, deliverables.md, the full text of every draft
+the chat produced (drafts/, also appended to deliverables.md) and the
+transcript written during the chat (transcript-*.md parts and their index);
+summary.md tabulates status and duration per run.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def load_briefs(path):
+    briefs = []
+    with open(path) as file:
+        for n, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            brand = item.get("brand", item.get("brand_task"))
+            brief = item.get("brief", item.get("user_task"))
+            if not brand or not brief:
+                raise ValueError(f"{path}:{n}: expected 'brand' and 'brief'")
+            briefs.append({"id": str(item.get("id", len(briefs) + 1)), "brand": brand, "brief": brief})
+    return briefs
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:40]
+
+
+# write_content hands the chat a preview and this handle; the full draft is in the artifact store
+DRAFT_ID = re.compile(r"\bdraft-[0-9a-f]{16}\b")
+
+
+def _write_drafts(run_dir, messages):
+    """Copy the drafts the chat refers to out of the shared, LRU-evicted artifact store.
+
+    Returns (artifact_id, topic, text) for each, in order of first mention.
+    """
+    from artifacts import artifacts
+    drafts = []
+    ids = DRAFT_ID.findall("\n".join(str(message.get("content") or "") for message in messages))
+    for artifact_id in dict.fromkeys(ids):
+        payload = artifacts.get(artifact_id)
+        if payload is None:
+            continue
+        os.makedirs(os.path.join(run_dir, "drafts"), exist_ok=True)
+        with open(os.path.join(run_dir, "drafts", f"{artifact_id}.md"), "w") as file:
+            file.write(payload["text"])
+        drafts.append((artifact_id, payload.get("topic", ""), payload["text"]))
+    return drafts
+
+
+def _write_outputs(run_dir, messages):
+    with open(os.path.join(run_dir, "transcript.json"), "w") as file:
+        json.dump(messages, file, indent=2, default=str)
+    with open(os.path.join(run_dir, "transcript.md"), "w") as file:
+        for message in messages:
+            file.write(f"### {message.get('name', message.get('role'))}\n\n{message.get('content') or ''}\n\n")
+    # the last thing each agent said is its deliverable for the brief
+    final = {}
+    for message in messages:
+        if message.get("content") and message.get("role") != "function":
+            final[message.get("name", message.get("role"))] = message["content"]
+    drafts = _write_drafts(run_dir, messages)
+    with open(os.path.join(run_dir, "deliverables.md"), "w") as file:
+        for name, content in final.items():
+            file.write(f"## {name}\n\n{content.replace('TERMINATE', '').strip()}\n\n")
+        if drafts:
+            file.write("## Drafts\n\n")
+        for artifact_id, topic, text in drafts:
+            file.write(f"### {topic or artifact_id} ({artifact_id})\n\n{text.replace('TERMINATE', '').strip()}\n\n")
+
+
+def run_brief(brief, out_dir):
+    """Worker entry point: run one brief in this process and write its outputs."""
+    os.environ["HUMAN_INPUT_MODE"] = "NEVER"
+    run_dir = os.path.abspath(os.path.join(out_dir, f"{brief['id']}-{_slug(brief['brand'])}"))
+    os.makedirs(run_dir, exist_ok=True)
+    result = {"id": brief["id"], "brand": brief["brand"], "dir": run_dir, "rounds": 0, "error": None}
+    start = time.perf_counter()
+    with open(os.path.join(run_dir, "stdout.log"), "w") as log, redirect_stdout(log), redirect_stderr(log):
+        messages = []
+        try:
+            import main
+            agency = main.build_agency(brief["brand"], brief["brief"], work_dir=run_dir, transcript_dir=run_dir)
+            messages = agency[2].messages
+            # one trace per brief, next to its transcript
+            main.run_agency(agency, brief["brand"], brief["brief"], trace_dir=run_dir)
+            result["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "failed"
+            result["error"] = f"{type(e).__name__}: {e}"
+        # partial transcripts of failed runs are kept too
+        result["rounds"] = len(messages)
+        _write_outputs(run_dir, messages)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def summary_table(results):
+    rows = ["| id | brand | status | rounds | seconds |", "|---|---|---|---|---|"]
+    for r in sorted(results, key=lambda r: r["id"]):
+        rows.append(f"| {r['id']} | {r['brand']} | {r['status']} | {r['rounds']} | {r['seconds']:.1f} |")
+    total = sum(r["seconds"] for r in results)
+    rows.append(f"\n{len(results)} runs, {total:.1f}s of agent time")
+    return "\n".join(rows)
+
+
+def run_batch(path, workers=2, out_dir="runs"):
+    briefs = load_briefs(path)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = []
+    # a fresh spawned interpreter per brief: agents, pools, caches and counters never carry over
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as pool:
+        futures = [pool.submit(run_brief, brief, out_dir) for brief in briefs]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"[{result['id']}] {result['brand']}: {result['status']} in {result['seconds']:.1f}s")
+            results.append(result)
+    table = summary_table(results) + f", {time.perf_counter() - start:.1f}s wall clock"
+    with open(os.path.join(out_dir, "summary.md"), "w") as file:
+        file.write(table + "\n")
+    print(table)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the agency over a JSONL file of briefs.")
+    parser.add_argument("briefs", help="JSONL file with one {brand, brief} object per line")
+    parser.add_argument("--workers", type=int, default=2, help="briefs to run in parallel")
+    parser.add_argument("--out", default="runs", help="output directory")
+    args = parser.parse_args()
+    results = run_batch(args.briefs, args.workers, args.out)
+    sys.exit(0 if all(r["status"] == "ok" for r in results) else 1)
@@ -0,0 +1,158 @@
+"""End-to-end benchmark of the research, write_content(s), agency group chat and agency pipeline flows.
+
+Usage:
+    python bench/run.py --profile fast
+    python bench/run.py --profile realistic --stages research,agency --save-baseline
+
+Every external service is replaced by bench/stubs.py, and the flows run in a
+fresh temporary working directory with their own caches, so runs are offline,
+repeatable and independent of the directory the bench is started from. For each stage the wall time, agent rounds, LLM calls, prompt and
+completion tokens and tool bytes fetched are reported and compared with
+bench/baselines/<profile>.json when it exists.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench.stubs import StubServer, PROFILES
+
+BASELINES = os.path.join(ROOT, "bench", "baselines")
+# --warm keeps caches here between runs; never the project's own cache, or stub pages,
+# completions and knowledge chunks would be served to real runs
+BENCH_CACHE_DIR = os.getenv("BENCH_CACHE_DIR", os.path.join(ROOT, ".cache", "bench"))
+STAGES = ("research", "write_content", "write_contents", "agency", "pipeline")
+METRICS = ("wall_seconds", "rounds", "llm_calls", "prompt_tokens", "completion_tokens", "bytes_fetched")
+
+BRAND = "Acme Outdoor"
+BRIEF = "Plan a spring launch campaign for a lightweight hiking boot aimed at first-time hikers."
+VARIANTS = ["First hike checklist", "Why boot weight matters", "Breaking in new boots", "Spring trails for beginners"]
+
+
+def configure(server, work_dir, warm=False):
+    """Point every client at the stub server; must run before tools/main are imported."""
+    base = server.url + "/v1"
+    cache_dir = BENCH_CACHE_DIR if warm else os.path.join(work_dir, "cache")
+    os.environ.update({
+        "OAI_CONFIG_LIST": json.dumps([{"model": "gpt-4", "api_key": "stub", "base_url": base}]),
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_API_BASE": base,
+        "OPENAI_BASE_URL": base,
+        "SERPER_API_KEY": "stub",
+        "BROWSERLESS_API_KEY": "stub",
+        "SERPER_URL": server.url + "/search",
+        "BROWSERLESS_URL": server.url + "/content",
+        "HUMAN_INPUT_MODE": "NEVER",
+        "LLM_CACHE_MODE": os.environ.get("LLM_CACHE_MODE", "read-through" if warm else "off"),
+        "CASSETTE_MODE": "off",
+        # every store derived from the cache dir, in case the environment points one elsewhere
+        "AGENCY_CACHE_DIR": cache_dir,
+        "ARTIFACT_DIR": os.path.join(cache_dir, "artifacts"),
+        "KNOWLEDGE_DIR": os.path.join(cache_dir, "knowledge"),
+        "TRANSCRIPT_DIR": os.path.join(cache_dir, "transcripts"),
+    })
+
+
+def run_stage(name, server, work_dir):
+    import tools
+    import main
+
+    server.reset()
+    start = time.perf_counter()
+    if name == "research":
+        tools.research(BRIEF)
+    elif name == "write_content":
+        tools.write_content("Research notes: " + BRIEF, BRIEF)
+    elif name == "write_contents":
+        tools.write_contents(VARIANTS, "Research notes: " + BRIEF, brand_voice=BRAND)
+    elif name == "agency":
+        main.run(BRAND, BRIEF, work_dir=work_dir)
+    elif name == "pipeline":
+        main.run_stages(BRAND, BRIEF, work_dir=work_dir)
+    wall = time.perf_counter() - start
+    stats = server.snapshot()
+    return {
+        "wall_seconds": round(wall, 3),
+        "rounds": stats["llm_turns"],
+        "llm_calls": stats["llm_calls"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "completion_tokens": stats["completion_tokens"],
+        "bytes_fetched": stats["bytes_fetched"],
+    }
+
+
+def table(results, baseline=None):
+    header = "| stage | " + " | ".join(METRICS) + " |"
+    rows = [header, "|---" * (len(METRICS) + 1) + "|"]
+    for stage, result in results.items():
+        cells = []
+        for metric in METRICS:
+            cell = f"{result[metric]:g}"
+            before = (baseline or {}).get(stage, {}).get(metric)
+            if before:
+                cell += f" ({(result[metric] - before) / before:+.0%})"
+            cells.append(cell)
+        rows.append(f"| {stage} | " + " | ".join(cells) + " |")
+    return "\n".join(rows)
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for stage, result in results.items():
+        for metric in METRICS:
+            before = baseline.get(stage, {}).get(metric)
+            if before and result[metric] > before * (1 + tolerance):
+                found.append(f"{stage}.{metric}: {before:g} -> {result[metric]:g}")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", default="fast", choices=sorted(PROFILES))
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ",".join(STAGES))
+    parser.add_argument("--warm", action="store_true", help="keep on-disk caches between runs (in BENCH_CACHE_DIR)")
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the profile's baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression before failing")
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.profile).start()
+    work_dir = tempfile.mkdtemp(prefix="agency-bench-")
+    configure(server, work_dir, args.warm)
+    # whatever a flow writes relative to the working directory (traces, stray caches) stays in the run's
+    os.chdir(work_dir)
+
+    results = {}
+    for stage in args.stages.split(","):
+        if stage not in STAGES:
+            parser.error(f"unknown stage {stage!r}")
+        results[stage] = run_stage(stage, server, work_dir)
+    server.shutdown()
+
+    path = os.path.join(BASELINES, f"{args.profile}.json")
+    baseline = None
+    if os.path.exists(path):
+        with open(path) as file:
+            baseline = json.load(file)
+    print(f"\nprofile: {args.profile}" + (f" (vs {os.path.relpath(path, ROOT)})" if baseline else ""))
+    print(table(results, baseline))
+
+    if args.save_baseline:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({**(baseline or {}), **results}, file, indent=2, sort_keys=True)
+        print(f"baseline saved to {os.path.relpath(path, ROOT)}")
+        return 0
+    if baseline:
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print("REGRESSION", line)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Local stand-ins for OpenAI, Serper and Browserless with configurable latency.
+
+One threaded HTTP server answers:
+    POST /v1/chat/completions   OpenAI-compatible, scripted agent behaviour
+    POST /search                Serper-compatible organic results
+    POST /content               Browserless-compatible rendered HTML
+    GET|HEAD /page/<n>          origin pages, with ETag for revalidation
+
+Agents are driven deterministically: tool-enabled agents call their tools
+once, speaker selection rotates over the offered roles, and every other turn
+returns filler text of the profile's completion size.
+"""
+import re
+import ast
+import json
+import time
+import zlib
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# seconds per call by route, plus output sizes
+PROFILES = {
+    "instant": {"llm": 0.0, "search": 0.0, "content": 0.0, "page": 0.0,
+                "jitter": 0.0, "completion_tokens": 150, "page_chars": 4000},
+    "fast": {"llm": 0.05, "search": 0.02, "content": 0.1, "page": 0.005,
+             "jitter": 0.1, "completion_tokens": 300, "page_chars": 6000},
+    "realistic": {"llm": 1.5, "search": 0.5, "content": 2.5, "page": 0.1,
+                  "jitter": 0.2, "completion_tokens": 500, "page_chars": 20000},
+}
+
+WORDS = ("brand audience market growth channel insight campaign message strategy "
+         "creative media research trend consumer value launch digital story").split()
+PROXIES = {"user_proxy", "admin", "User_proxy"}
+
+
+def _filler(tokens, seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+
+def _content(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, profile="fast", host="127.0.0.1", port=0):
+        super().__init__((host, port), StubHandler)
+        self.profile = PROFILES[profile] if isinstance(profile, str) else profile
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+        self.reset()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def reset(self):
+        with self.lock:
+            self.stats = {
+                "llm_calls": 0, "llm_turns": 0, "llm_selects": 0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+                "searches": 0, "scrapes": 0, "page_requests": 0, "bytes_fetched": 0,
+            }
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def count(self, **deltas):
+        with self.lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def delay(self, route):
+        base = self.profile[route]
+        with self.lock:
+            jitter = self.random.uniform(-1, 1) * self.profile["jitter"] * base
+        if base > 0:
+            time.sleep(max(0.0, base + jitter))
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body, content_type="application/json", headers=None, head=False):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+        return len(data)
+
+    def do_POST(self):
+        server = self.server
+        path = self.path.split("?")[0]
+        if path.endswith("/chat/completions"):
+            server.delay("llm")
+            self._send(200, json.dumps(self._chat(self._body())))
+        elif path == "/search":
+            server.delay("search")
+            query = self._body().get("q", "")
+            organic = [{
+                "title": f"{query} result {i}",
+                "link": f"{server.url}/page/{zlib.crc32(query.encode()) % 1000}-{i}",
+                "snippet": _filler(30, f"{query}{i}"),
+            } for i in range(5)]
+            sent = self._send(200, json.dumps({"organic": organic}))
+            server.count(searches=1, bytes_fetched=sent)
+        elif path == "/content":
+            server.delay("content")
+            url = self._body().get("url", "")
+            sent = self._send(200, self._page(url), "text/html")
+            server.count(scrapes=1, bytes_fetched=sent)
+        else:
+            self._send(404, "{}")
+
+    def do_GET(self, head=False):
+        server = self.server
+        if self.path.startswith("/page/"):
+            server.delay("page")
+            etag = f'"{self.path.rsplit("/", 1)[-1]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", headers={"ETag": etag}, head=True)
+            else:
+                sent = self._send(200, self._page(self.path), "text/html", {"ETag": etag}, head=head)
+                server.count(bytes_fetched=0 if head else sent)
+            server.count(page_requests=1)
+        else:
+            self._send(404, "{}", head=head)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def _page(self, url):
+        chars = self.server.profile["page_chars"]
+        paragraphs = "".join(f"<p>{_filler(60, f'{url}{i}')}</p>" for i in range(max(1, chars // 450)))
+        return (f"<html><head><script>var x=1;</script></head><body><nav><a href='/'>Home</a></nav>"
+                f"<main><h1>{url}</h1>{paragraphs}</main><footer>footer</footer></body></html>")
+
+    def _chat(self, body):
+        server = self.server
+        messages = body.get("messages", [])
+        functions = [f["name"] for f in body.get("functions", [])]
+        last = _content(messages[-1]) if messages else ""
+        called = {m.get("name") for m in messages if m.get("role") in ("function", "tool")}
+        prompt_tokens = sum(len(_content(m)) for m in messages) // 4
+        message = {"role": "assistant", "content": None}
+
+        if "select the next role" in last:
+            roles = ast.literal_eval(re.search(r"\[.*?\]", last).group(0))
+            speakers = [r for r in roles if r not in PROXIES] or roles
+            message["content"] = speakers[len(messages) % len(speakers)]
+            server.count(llm_selects=1)
+        elif "search" in functions and "search" not in called:
+            message["function_call"] = {"name": "search", "arguments": json.dumps({"query": last[:80]})}
+        elif "scrape" in functions and "scrape" not in called:
+            links = re.findall(r"https?://[^\s\"'\\]+/page/[\w-]+", " ".join(_content(m) for m in messages))
+            message["function_call"] = {"name": "scrape", "arguments": json.dumps({"url": links[0] if links else server.url + "/page/0"})}
+        elif "research" in functions and "research" not in called:
+            message["function_call"] = {"name": "research", "arguments": json.dumps({"query": last[:80]})}
+        else:
+            text = _filler(server.profile["completion_tokens"], last[-200:])
+            if "search" in functions:
+                text += "\nReferences: " + server.url + "/page/0\nTERMINATE"
+            message["content"] = text
+
+        completion_tokens = len(json.dumps(message)) // 4
+        server.count(llm_calls=1, llm_turns=0 if "select the next role" in last else 1,
+                     prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        return {
+            "id": f"chatcmpl-stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "function_call" if message.get("function_call") else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
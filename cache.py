@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import hashlib
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Future
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from diskcache import Cache
+
+CACHE_DIR = os.getenv("AGENCY_CACHE_DIR", ".cache/agency")
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 24 * 60 * 60))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 64 * 1024 * 1024))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", 7 * 24 * 60 * 60))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256 * 1024 * 1024))
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", 30 * 24 * 60 * 60))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 128 * 1024 * 1024))
+# pages younger than this are served without revalidating against the origin
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", 60 * 60))
+
+
+# query parameters that only attribute the click and never change the page; generic names
+# such as ref or spm are left alone, since many sites select content with them (?ref=<branch>)
+TRACKING_PARAMS = re.compile(
+    r"^(utm_\w+|gclid|gclsrc|dclid|fbclid|msclkid|yclid|twclid|igshid|mc_cid|mc_eid|"
+    r"_ga|_gl|_hsenc|_hsmi|mkt_tok|ref_src|srsltid)$", re.I)
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return re.sub(r"\s+", " ", str(query)).strip().lower()
+
+
+def canonical_url(url):
+    """Key a page by what it serves.
+
+    Lowercases the host, treats http and https alike, drops default ports,
+    fragments, repeated and trailing slashes and click-tracking parameters,
+    and sorts the remaining query parameters.
+    """
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower() or "http"
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    return urlunsplit((scheme, host, path, urlencode(params), ""))
+
+
+def content_key(namespace, payload):
+    """Content-addressed key: a sha256 of the namespace plus the canonical JSON payload."""
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f"{namespace}:" + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ToolCache:
+    """A persistent TTL cache with size-bounded LRU eviction and hit/miss counters.
+
+    Backed by diskcache, so it is shared across agents, processes and runs.
+    A ttl of 0 or less disables the cache.
+    """
+
+    def __init__(self, name, ttl, size_limit):
+        self.name = name
+        self.ttl = ttl
+        # set while a cassette records or replays, so every request reaches it
+        self.bypass = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cache = Cache(
+            os.path.join(CACHE_DIR, name),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and not self.bypass
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self._cache.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def peek(self, key):
+        """Read an entry without counting a hit or miss."""
+        return self._cache.get(key) if self.enabled else None
+
+    def set(self, key, value):
+        if self.enabled:
+            self._cache.set(key, value, expire=self.ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "name": self.name,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": len(self._cache),
+            "bytes": self._cache.volume(),
+        }
+
+    def report(self):
+        s = self.stats()
+        return (f"{s['name']} cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['entries']} entries in {s['bytes'] / 1024:.0f} KiB")
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    block on the same future and receive its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+
+class SessionMemo:
+    """Results already produced in this session, keyed by canonical URL.
+
+    Unlike the page cache it never expires, revalidates or touches disk, so a
+    page requested again under another URL spelling is not fetched twice.
+    `saved` counts the repeats it answered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = {}
+        self.saved = 0
+
+    def get(self, key):
+        """(True, result) for a key seen this session, else (False, None)."""
+        with self._lock:
+            if key in self._results:
+                self.saved += 1
+                return True, self._results[key]
+        return False, None
+
+    def set(self, key, result):
+        with self._lock:
+            self._results[key] = result
+
+    def reset(self):
+        with self._lock:
+            self._results.clear()
+            self.saved = 0
+
+    def report(self):
+        with self._lock:
+            return f"Scrape dedup: {self.saved} repeated scrapes served in-session, {len(self._results)} distinct pages"
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent awaits of the same key share one task."""
+
+    def __init__(self):
+        self._inflight = {}
+        self.shared = 0
+
+    async def do(self, key, fn):
+        key = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+
+def page_is_fresh(entry, max_age=PAGE_CACHE_MAX_AGE):
+    return time.time() - entry.get("fetched_at", 0) < max_age
+
+
+search_cache = ToolCache("search", ttl=SEARCH_CACHE_TTL, size_limit=SEARCH_CACHE_SIZE)
+page_cache = ToolCache("pages", ttl=PAGE_CACHE_TTL, size_limit=PAGE_CACHE_SIZE)
+summary_cache = ToolCache("summaries", ttl=SUMMARY_CACHE_TTL, size_limit=SUMMARY_CACHE_SIZE)
+scrape_flight = SingleFlight()
+a_scrape_flight = AsyncSingleFlight()
+# each agency run gets its own SessionMemo, so concurrent briefs on one loop keep their dedup apart
+_scrape_session = contextvars.ContextVar("scrape_session", default=None)
+_process_session = SessionMemo()
+
+
+def scrape_session():
+    """The current run's SessionMemo; scrapes outside any run share a process-wide one."""
+    return _scrape_session.get() or _process_session
+
+
+def start_scrape_session():
+    """Start a fresh SessionMemo for the run in the current context (thread or task) and return it."""
+    session = SessionMemo()
+    _scrape_session.set(session)
+    return session
+
+
+def report():
+    """Tool cache and single-flight lines for the end-of-run summary."""
+    lines = [c.report() for c in (search_cache, page_cache, summary_cache)]
+    lines.append(f"Scrape single-flight: {scrape_flight.shared + a_scrape_flight.shared} "
+                 f"concurrent requests shared a fetch")
+    return "\n".join(lines)
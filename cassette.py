@@ -0,0 +1,129 @@
+import os
+import re
+import gzip
+import json
+import time
+import atexit
+import asyncio
+import threading
+from cache import content_key, search_cache, page_cache, summary_cache
+
+# path of a gzipped JSONL cassette; empty disables record/replay
+CASSETTE = os.getenv("CASSETTE", "")
+# record: call services and append every exchange; replay: serve exchanges from the cassette
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "replay" if CASSETTE else "off")
+# recorded: sleep for each exchange's original duration on replay; instant: return immediately
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "instant")
+
+# credentials that appear in URLs are never part of a key
+_SECRET_PARAMS = re.compile(r"([?&](?:token|key|api_key|apikey)=)[^&]*", re.I)
+
+
+class CassetteMiss(KeyError):
+    """Raised on replay when a request was never recorded."""
+
+
+def redact_url(url):
+    return _SECRET_PARAMS.sub(r"\1-", url)
+
+
+class Cassette:
+    """Record outbound LLM and tool calls with their timing, or replay them offline.
+
+    Each exchange is one JSON line: its kind ("http", "llm", ...), a content
+    hash of the request, the wall time it took and the encoded response.
+    Repeated identical requests replay in recorded order.
+    """
+
+    def __init__(self, path, mode="off", latency="instant"):
+        if mode not in ("record", "replay", "off"):
+            raise ValueError(f"CASSETTE_MODE must be record, replay or off, got {mode!r}")
+        self.path = path
+        self.mode = mode if path else "off"
+        self.latency = latency
+        self.recorded = 0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._file = None
+        if self.mode == "replay":
+            self._load()
+        elif self.mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            atexit.register(self.close)
+
+    @property
+    def active(self):
+        return self.mode != "off"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            for line in file:
+                entry = json.loads(line)
+                self._entries.setdefault(entry["key"], []).append(entry)
+
+    def _replay(self, kind, request):
+        key = content_key(kind, request)
+        with self._lock:
+            queue = self._entries.get(key)
+            if not queue:
+                raise CassetteMiss(f"{kind} request not in cassette {self.path}: {json.dumps(request)[:200]}")
+            # keep the last exchange so extra identical calls still replay
+            entry = queue.pop(0) if len(queue) > 1 else queue[0]
+            self.replayed += 1
+        return entry
+
+    def _record(self, kind, request, seconds, response):
+        line = json.dumps({
+            "kind": kind,
+            "key": content_key(kind, request),
+            "seconds": round(seconds, 4),
+            "response": response,
+        }, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def call(self, kind, request, fn, encode=lambda r: r, decode=lambda r: r):
+        """Run fn() through the cassette; `request` must be JSON-serializable and identify the call."""
+        if self.mode == "replay":
+            entry = self._replay(kind, request)
+            if self.latency == "recorded":
+                time.sleep(entry["seconds"])
+            return decode(entry["response"])
+        if self.mode == "off":
+            return fn()
+        start = time.perf_counter()
+        result = fn()
+        self._record(kind, request, time.perf_counter() - start, encode(result))
+        return result
+
+    async def a_call(self, kind, request, fn, encode=lambda r: r, decode=lambda r: r):
+        """Async counterpart of call(); fn is a coroutine function."""
+        if self.mode == "replay":
+            entry = self._replay(kind, request)
+            if self.latency == "recorded":
+                await asyncio.sleep(entry["seconds"])
+            return decode(entry["response"])
+        if self.mode == "off":
+            return await fn()
+        start = time.perf_counter()
+        result = await fn()
+        self._record(kind, request, time.perf_counter() - start, encode(result))
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+cassette = Cassette(CASSETTE, CASSETTE_MODE, CASSETTE_LATENCY)
+if cassette.active:
+    # a cache hit would never reach the cassette, and a replay machine starts with
+    # empty caches, so record and replay both bypass the persistent tool caches
+    for tool_cache in (search_cache, page_cache, summary_cache):
+        tool_cache.bypass = True
@@ -0,0 +1,162 @@
+import os
+import re
+import math
+import hashlib
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# context windows in tokens, matched by longest model-name prefix
+MODEL_CONTEXT = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-3.5-turbo-1106": 16385,
+    "gpt-3.5-turbo-0125": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+}
+DEFAULT_CONTEXT = 4096
+# tokens kept free for the model's answer
+OUTPUT_RESERVE = int(os.getenv("SUMMARY_OUTPUT_RESERVE", 1024))
+# chunks never exceed this even on long-context models, to keep map calls parallel
+MAX_CHUNK_TOKENS = int(os.getenv("SUMMARY_MAX_CHUNK_TOKENS", 12000))
+# overlap between neighbouring chunks, as a fraction of the chunk budget; it depends on
+# nothing else, so an edit that changes a page's length does not move every chunk
+OVERLAP_RATIO = 0.05
+# chunk boundaries are content-defined and average this share of the budget, leaving
+# room for a run of paragraphs without a boundary before the budget forces a cut
+CHUNK_TARGET_RATIO = 0.5
+# scraped pages above this many tokens are summarized before reaching the agent
+SCRAPE_TOKEN_BUDGET = int(os.getenv("SCRAPE_TOKEN_BUDGET", 2000))
+
+_encodings = {}
+
+
+def context_window(model):
+    matches = [name for name in MODEL_CONTEXT if model.startswith(name)]
+    return MODEL_CONTEXT[max(matches, key=len)] if matches else DEFAULT_CONTEXT
+
+
+def encoding(model):
+    """The tiktoken encoding for a model, or None when it cannot be loaded (e.g. offline)."""
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    enc = encoding(model)
+    if enc is None:
+        # roughly four characters per token for English text
+        return math.ceil(len(text) / 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+class ChunkPlanner:
+    """Size chunks to the model's context window in real tokens.
+
+    The chunk budget is the context window minus the prompt and an answer
+    reserve. Neighbouring chunks overlap by a fixed share of that budget, so
+    a chunk's text, and its summary cache key, depend only on the text around
+    it and never on the length of the whole page.
+
+    Chunks end after paragraphs picked by a hash of the paragraph's own text
+    (a content-defined cut point), not by packing the page greedily, so an
+    edit only changes the chunks it falls in; the boundaries after it stay put.
+    """
+
+    def __init__(self, model, prompt="", output_reserve=OUTPUT_RESERVE, max_chunk_tokens=MAX_CHUNK_TOKENS):
+        self.model = model
+        self.prompt_tokens = count_tokens(prompt, model)
+        self.budget = max(256, min(
+            context_window(model) - self.prompt_tokens - output_reserve, max_chunk_tokens))
+
+    def count(self, text):
+        return count_tokens(text, self.model)
+
+    def needs_summary(self, text, budget=SCRAPE_TOKEN_BUDGET):
+        return self.count(text) > min(budget, self.budget)
+
+    def plan(self, total):
+        """Return (chunk_tokens, overlap_tokens) for a text of `total` tokens."""
+        if total <= self.budget:
+            return self.budget, 0
+        return self.budget, int(self.budget * OVERLAP_RATIO)
+
+    def _units(self, text, size):
+        """The paragraphs of `text`; any longer than `size` tokens are cut on lines, sentences or words."""
+        splitter = RecursiveCharacterTextSplitter(
+            separators=["\n", ". ", " ", ""],
+            chunk_size=size,
+            chunk_overlap=0,
+            length_function=self.count,
+        )
+        units = []
+        for paragraph in text.split("\n\n"):
+            paragraph = paragraph.strip()
+            if paragraph:
+                units.extend([paragraph] if self.count(paragraph) <= size else splitter.split_text(paragraph))
+        return units
+
+    @staticmethod
+    def _cut_after(unit, tokens, target):
+        # a hash of the paragraph alone, weighted by its length so chunks average `target` tokens
+        digest = int.from_bytes(hashlib.blake2b(unit.encode("utf-8"), digest_size=8).digest(), "big")
+        return digest < 2 ** 64 * min(1.0, tokens / target)
+
+    def _tail(self, text, tokens):
+        """The last sentences of `text` that fit in `tokens`, carried into the next chunk as overlap."""
+        tail = ""
+        for sentence in reversed(re.split(r"(?<=[.!?])\s+", text)):
+            candidate = f"{sentence} {tail}" if tail else sentence
+            if self.count(candidate) > tokens:
+                break
+            tail = candidate
+        return tail
+
+    def split(self, text):
+        size, overlap = self.plan(self.count(text))
+        if not overlap:
+            return [text] if text.strip() else []
+        room = size - overlap
+        groups, current, used = [], [], 0
+        for unit in self._units(text, room):
+            # +1 for the paragraph break joining it to the previous one
+            tokens = self.count(unit) + 1
+            if current and used + tokens > room:
+                groups.append(current)
+                current, used = [], 0
+            current.append(unit)
+            used += tokens
+            if self._cut_after(unit, tokens, room * CHUNK_TARGET_RATIO):
+                groups.append(current)
+                current, used = [], 0
+        if current:
+            groups.append(current)
+        chunks = []
+        for i, group in enumerate(groups):
+            tail = self._tail(groups[i - 1][-1], overlap) if i else ""
+            chunks.append("\n\n".join([tail, *group] if tail else group))
+        return chunks
+
+    def group(self, texts, separator="\n\n"):
+        """Pack texts into as few groups as fit the chunk budget."""
+        groups, current, size = [], [], 0
+        for text in texts:
+            tokens = self.count(text) + (self.count(separator) if current else 0)
+            if current and size + tokens > self.budget:
+                groups.append(separator.join(current))
+                current, size = [], 0
+            current.append(text)
+            size += tokens
+        groups.append(separator.join(current))
+        return groups
@@ -0,0 +1,192 @@
+import os
+import json
+import threading
+from cache import content_key
+from chunking import count_tokens
+import tracing
+
+# prompt tokens an agent may be sent per reply; 0 sends the full history
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000))
+# per-agent overrides, e.g. '{"Agency_Director": 4000}'
+CONTEXT_BUDGETS = json.loads(os.getenv("CONTEXT_BUDGETS", "{}"))
+# most recent turns always sent verbatim (shrinks down to 1 if the budget requires)
+CONTEXT_KEEP_RECENT = int(os.getenv("CONTEXT_KEEP_RECENT", 6))
+# older tool outputs above this size are replaced by a digest and a reference
+CONTEXT_DIGEST_TOKENS = int(os.getenv("CONTEXT_DIGEST_TOKENS", 600))
+# size of each folded turn's line in the summary of earlier turns
+CONTEXT_TURN_TOKENS = int(os.getenv("CONTEXT_TURN_TOKENS", 60))
+
+# the schema attach() gives every compacted agent, so the references it is shown can be followed
+RECALL_FUNCTION = {
+    "name": "recall",
+    "description": "Return the full text of an earlier message or tool output that was shortened to a reference such as ctx-1a2b3c4d5e6f",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "ref": {
+                "type": "string",
+                "description": "The reference, e.g. ctx-1a2b3c4d5e6f",
+            }
+        },
+        "required": ["ref"],
+    },
+}
+
+
+def _text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    if message.get("function_call"):
+        call = message["function_call"]
+        content += f"\n{call.get('name')}({call.get('arguments', '')})"
+    return content
+
+
+def _head(text, tokens):
+    """The first ~`tokens` tokens of text, cut at a word boundary."""
+    text = " ".join(text.split())
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+class ContextCompactor:
+    """Keep the prompt each agent sees under a token budget.
+
+    While a conversation fits the budget it is sent unchanged. Beyond it, the
+    first message (the brief) and the most recent turns stay verbatim, large
+    tool outputs in between are replaced by a digest, and everything older is
+    folded into one summary message. Replaced text is kept under a reference
+    that recall() returns in full. Compaction is extractive, so it costs no
+    LLM calls and folded turns render identically from round to round.
+    """
+
+    def __init__(self, model="gpt-4", budget=CONTEXT_TOKEN_BUDGET, budgets=CONTEXT_BUDGETS,
+                 keep_recent=CONTEXT_KEEP_RECENT, digest_tokens=CONTEXT_DIGEST_TOKENS,
+                 turn_tokens=CONTEXT_TURN_TOKENS):
+        self.model = model
+        self.budget = budget
+        self.budgets = dict(budgets)
+        self.keep_recent = keep_recent
+        self.digest_tokens = digest_tokens
+        self.turn_tokens = turn_tokens
+        self.references = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.compactions = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def count(self, message):
+        text = _text(message)
+        tokens = self._counts.get(text)
+        if tokens is None:
+            # +4 for the role/name framing of each chat message
+            tokens = self._counts[text] = count_tokens(text, self.model) + 4
+        return tokens
+
+    def total(self, messages):
+        return sum(self.count(m) for m in messages)
+
+    def store(self, text):
+        ref = "ctx-" + content_key("context", text).split(":", 1)[1][:12]
+        with self._lock:
+            self.references[ref] = text
+        return ref
+
+    def recall(self, ref):
+        """Full text behind a reference left by compaction."""
+        return self.references.get(ref.strip(), f"No context stored under {ref!r}.")
+
+    def digest(self, message):
+        text = _text(message)
+        ref = self.store(text)
+        label = message.get("name") or message.get("role")
+        content = (f"[{label} output, {self.count(message)} tokens, digested; "
+                   f"recall('{ref}') returns the full text]\n{_head(text, self.turn_tokens * 2)}")
+        return {**message, "content": content}
+
+    def fold(self, messages):
+        lines = []
+        for message in messages:
+            text = _text(message)
+            if not text.strip():
+                continue
+            label = message.get("name") or message.get("role")
+            lines.append(f"- {label}: {_head(text, self.turn_tokens)} [{self.store(text)}]")
+        return {
+            "role": "system",
+            "content": "Summary of earlier turns (recall a reference for the full text):\n" + "\n".join(lines),
+        }
+
+    def _is_large_output(self, message):
+        return message.get("role") == "function" and self.count(message) > self.digest_tokens
+
+    def compact(self, messages, budget=None):
+        """Return the messages to send in place of `messages`; unchanged while they fit."""
+        budget = self.budget if budget is None else budget
+        if not budget or len(messages) < 3:
+            return messages
+        before = self.total(messages)
+        if before <= budget:
+            return messages
+
+        first, rest = messages[0], list(messages[1:])
+        # the latest message is what the agent acts on, so it is never digested
+        rest = [self.digest(m) if i < len(rest) - 1 and self._is_large_output(m) else m
+                for i, m in enumerate(rest)]
+        keep = min(self.keep_recent, len(rest))
+        while True:
+            start = len(rest) - keep
+            # a function result stays with the call that produced it
+            while start > 0 and rest[start].get("role") == "function":
+                start -= 1
+            older, recent = rest[:start], rest[start:]
+            compacted = [first] + ([self.fold(older)] if older else []) + recent
+            if keep <= 1 or self.total(compacted) <= budget:
+                break
+            keep -= 1
+
+        after = self.total(compacted)
+        with self._lock:
+            self.compactions += 1
+            self.tokens_before += before
+            self.tokens_after += after
+        tracing.annotate(context_tokens=after, context_tokens_saved=before - after)
+        return compacted
+
+    def attach(self, agent):
+        """Compact the history `agent` is sent on every reply, under its budget.
+
+        An agent with an LLM also gets the recall function, schema and
+        implementation, unless it already has them.
+        """
+        budget = self.budgets.get(agent.name, self.budget)
+        if agent.llm_config:
+            if not any(f.get("name") == "recall" for f in agent.llm_config.get("functions", [])):
+                agent.update_function_signature(RECALL_FUNCTION, is_remove=None)
+            if not agent.can_execute_function("recall"):
+                agent.register_function({"recall": self.recall})
+        reply, a_reply = agent.generate_reply, agent.a_generate_reply
+
+        def generate_reply(messages=None, sender=None, **kwargs):
+            if messages is None and sender is not None:
+                messages = self.compact(agent.chat_messages[sender], budget)
+            return reply(messages=messages, sender=sender, **kwargs)
+
+        async def a_generate_reply(messages=None, sender=None, **kwargs):
+            if messages is None and sender is not None:
+                messages = self.compact(agent.chat_messages[sender], budget)
+            return await a_reply(messages=messages, sender=sender, **kwargs)
+
+        agent.generate_reply = generate_reply
+        agent.a_generate_reply = a_generate_reply
+        return agent
+
+    def report(self):
+        with self._lock:
+            saved = self.tokens_before - self.tokens_after
+            return (f"Context compaction: {self.compactions} compacted prompts, "
+                    f"{self.tokens_before} -> {self.tokens_after} tokens ({saved} saved)")
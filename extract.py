@@ -0,0 +1,160 @@
+import os
+import re
+import codecs
+from html.parser import HTMLParser
+
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", 2 * 1024 * 1024))
+
+# subtrees dropped while parsing, never buffered
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+    "nav", "header", "footer", "aside", "form", "button", "select", "dialog",
+}
+SKIP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alert"}
+SKIP_ATTR = re.compile(r"(^|[\s_-])(cookie|consent|newsletter|share|social|breadcrumb|sidebar|related|promo|advert|popup|modal)([\s_-]|$)", re.I)
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dd", "dt", "td", "th", "tr",
+    "table", "blockquote", "pre", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+MAIN_TAGS = {"main", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# elements whose end tag HTML makes optional, and the start tags that close them implicitly
+IMPLICIT_CLOSE = {
+    "p": (BLOCK_TAGS | SKIP_TAGS | {"address", "details", "fieldset", "figure", "menu"}) - {"br", "hr"},
+    "li": {"li"},
+    "dt": {"dt", "dd"},
+    "dd": {"dt", "dd"},
+    "tr": {"tr"},
+    "td": {"td", "th", "tr"},
+    "th": {"td", "th", "tr"},
+    "option": {"option", "optgroup"},
+}
+
+MIN_PARAGRAPH_CHARS = 40
+MAX_LINK_DENSITY = 0.5
+
+
+class _Extractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self._skip = []
+        self._main = 0
+        self._heading = 0
+        self._link = 0
+        self._parts = []
+        self._link_chars = 0
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._parts)).strip()
+        if text:
+            self.paragraphs.append({
+                "text": text,
+                "main": self._main > 0,
+                "heading": self._heading > 0,
+                "link_density": self._link_chars / len(text),
+            })
+        self._parts = []
+        self._link_chars = 0
+
+    def _skippable(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            return True
+        attrs = dict(attrs)
+        if (attrs.get("role") or "").lower() in SKIP_ROLES or attrs.get("aria-hidden") == "true":
+            return True
+        return bool(SKIP_ATTR.search(f"{attrs.get('id') or ''} {attrs.get('class') or ''}"))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if not self._skip and tag in BLOCK_TAGS:
+                self._flush()
+            return
+        if self._skip:
+            # a start tag can end elements whose end tag is optional, the skipped root included
+            while self._skip and tag in IMPLICIT_CLOSE.get(self._skip[-1], ()):
+                self._skip.pop()
+            if self._skip:
+                self._skip.append(tag)
+                return
+        if self._skippable(tag, attrs):
+            self._skip.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main += 1
+        elif tag in HEADINGS:
+            self._heading += 1
+        elif tag == "a":
+            self._link += 1
+
+    def handle_endtag(self, tag):
+        if self._skip:
+            if tag in self._skip:
+                # closes the element and whatever was left open inside it
+                del self._skip[len(self._skip) - 1 - self._skip[::-1].index(tag):]
+                return
+            if not all(open_tag in IMPLICIT_CLOSE for open_tag in self._skip):
+                return
+            # the end of a parent (</ul>, </div>, ...) closes skipped elements with optional end tags
+            self._skip.clear()
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main = max(0, self._main - 1)
+        elif tag in HEADINGS:
+            self._heading = max(0, self._heading - 1)
+        elif tag == "a":
+            self._link = max(0, self._link - 1)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._link:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _keep(paragraph):
+    if paragraph["link_density"] > MAX_LINK_DENSITY:
+        return False
+    return paragraph["heading"] or len(paragraph["text"]) >= MIN_PARAGRAPH_CHARS
+
+
+def extract_text(chunks, max_bytes=EXTRACT_MAX_BYTES, encoding="utf-8"):
+    """Stream HTML chunks (bytes or str) into clean main-content paragraphs.
+
+    Boilerplate subtrees are dropped as they are parsed and input beyond
+    max_bytes is never read. If the page marks up <main>/<article>, only that
+    content is kept; otherwise short and link-heavy blocks are discarded.
+    """
+    parser = _Extractor()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    seen = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(encoding, errors="replace")
+        chunk = chunk[:max_bytes - seen]
+        seen += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if seen >= max_bytes:
+            break
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+
+    paragraphs = parser.paragraphs
+    main = [p for p in paragraphs if p["main"]]
+    if sum(len(p["text"]) for p in main if not p["heading"]) >= MIN_PARAGRAPH_CHARS:
+        paragraphs = main
+    return "\n\n".join(p["text"] for p in paragraphs if _keep(p))
+
+
+def extract(html, max_bytes=EXTRACT_MAX_BYTES):
+    """Extract from a complete document held in memory."""
+    return extract_text([html], max_bytes=max_bytes)
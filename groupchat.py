@@ -0,0 +1,97 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from autogen import GroupChat
+from compaction import ContextCompactor
+from speaker import LocalSelector, executor, caller
+from transcript import TranscriptWriter
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgencyGroupChat(GroupChat):
+    """GroupChat whose agents and speaker selection see a compacted history.
+
+    groupchat.messages always keeps the full transcript; only the prompts built
+    from it go through the compactor. With a `selector` the next speaker is
+    picked locally, and the manager's LLM is asked only when the selector
+    returns None, choosing among the selector's candidates. With a `transcript`
+    every appended message is also queued to its writer.
+
+    A function call is run by its caller when the caller can run it, so the
+    transitions after the result are the caller's, not those of whichever
+    other agent shares the function.
+    """
+
+    compactor: Optional[ContextCompactor] = None
+    selector: Optional[LocalSelector] = None
+    transcript: Optional[TranscriptWriter] = None
+
+    def __post_init__(self):
+        if self.compactor is not None:
+            for agent in self.agents:
+                self.compactor.attach(agent)
+
+    def append(self, message):
+        super().append(message)
+        if self.transcript is not None:
+            self.transcript.write(message)
+
+    def _selection_context(self, agents, selector):
+        messages = self.messages
+        if self.compactor is not None:
+            budget = self.compactor.budgets.get(selector.name, self.compactor.budget)
+            messages = self.compactor.compact(messages, budget)
+        return messages + [{"role": "system", "content": self.select_speaker_prompt(agents)}]
+
+    def _resolve(self, name, last_speaker, agents):
+        # If exactly one agent is mentioned, use it; otherwise fall back to round robin
+        mentions = self._mentioned_agents(name, agents)
+        if len(mentions) == 1:
+            name = next(iter(mentions))
+        else:
+            logger.warning(f"select_speaker could not resolve the next speaker from the reply:\n{name}")
+        try:
+            return self.agent_by_name(name)
+        except ValueError:
+            return self.next_agent(last_speaker, agents)
+
+    def _select_locally(self, last_speaker):
+        """(speaker, candidates): the speaker when picked without the LLM, else the agents it should choose from."""
+        if self.func_call_filter:
+            selected_agent = executor(last_speaker, self.messages, self.agents)
+            if selected_agent:
+                tracing.annotate(method="executor")
+                return selected_agent, [selected_agent]
+        selected_agent, agents = self._prepare_and_select_agents(last_speaker)
+        if selected_agent:
+            return selected_agent, agents
+        if self.selector is not None:
+            selected_agent = self.selector.select(last_speaker, self.messages, agents)
+            tracing.annotate(method="local" if selected_agent else "llm")
+            if selected_agent:
+                return selected_agent, agents
+            agents = self.selector.candidates(caller(last_speaker, self.messages, self.agents), agents)
+        return None, agents
+
+    def select_speaker(self, last_speaker, selector):
+        selected_agent, agents = self._select_locally(last_speaker)
+        if selected_agent:
+            return selected_agent
+        selector.update_system_message(self.select_speaker_msg(agents))
+        final, name = selector.generate_oai_reply(self._selection_context(agents, selector))
+        if not final:
+            return self.next_agent(last_speaker, agents)
+        return self._resolve(name, last_speaker, agents)
+
+    async def a_select_speaker(self, last_speaker, selector):
+        selected_agent, agents = self._select_locally(last_speaker)
+        if selected_agent:
+            return selected_agent
+        selector.update_system_message(self.select_speaker_msg(agents))
+        final, name = await selector.a_generate_oai_reply(self._selection_context(agents, selector))
+        if not final:
+            return self.next_agent(last_speaker, agents)
+        return self._resolve(name, last_speaker, agents)
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import base64
+import random
+import asyncio
+import threading
+from urllib.parse import urlsplit
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from cassette import cassette, redact_url
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 60))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 3))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.5))
+# total seconds one request may take across all its attempts and backoffs
+HTTP_DEADLINE = float(os.getenv("HTTP_DEADLINE", 180))
+HTTP_HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", 8))
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", 30))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without touching the network while a host's breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and lets one probe through after `cooldown`.
+
+    While the probe is in flight every other caller is refused; its outcome
+    closes the breaker or re-opens it for another cooldown. A probe that never
+    reports back is replaced once a further cooldown has passed.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            since = now - (self.opened_at if self.probe_started is None else self.probe_started)
+            if since < self.cooldown:
+                return False
+            # half-open: this caller is the probe
+            self.probe_started = now
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                self.probe_started = None
+            else:
+                self.failures += 1
+                # a failed probe re-opens at once
+                if self.probe_started is not None or self.failures >= self.threshold:
+                    self.opened_at = time.monotonic()
+                    self.probe_started = None
+
+
+class BufferedResponse:
+    """The parts of a requests.Response the tools use, for aiohttp and replayed responses."""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=64 * 1024):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def _exchange(method, url, kwargs):
+    """What identifies a request in a cassette: never headers, never URL credentials."""
+    data = kwargs.get("data")
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    return {"method": method, "url": redact_url(url), "params": kwargs.get("params"),
+            "data": data, "json": kwargs.get("json")}
+
+
+def _encode(response):
+    try:
+        body = {"text": response.content.decode("utf-8")}
+    except UnicodeDecodeError:
+        body = {"b64": base64.b64encode(response.content).decode("ascii")}
+    return {"url": redact_url(str(response.url)), "status_code": response.status_code,
+            "headers": dict(response.headers), **body}
+
+
+def _decode(data):
+    content = data["text"].encode("utf-8") if "text" in data else base64.b64decode(data["b64"])
+    return BufferedResponse(data["url"], data["status_code"], data["headers"], content)
+
+
+def _buffered(response):
+    buffered = BufferedResponse(response.url, response.status_code, response.headers, response.content)
+    response.close()
+    return buffered
+
+
+_lock = threading.Lock()
+_session = None
+_host_limits = {}
+_breakers = {}
+_async_sessions = {}
+_async_limits = {}
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower()
+
+
+def _breaker(host):
+    with _lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def _host_limit(host):
+    with _lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(HTTP_HOST_CONCURRENCY)
+        return _host_limits[host]
+
+
+def session():
+    """The process-wide keep-alive session shared by every tool."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=HTTP_HOST_CONCURRENCY)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def _backoff(attempt):
+    # full jitter: uniform in [0, base * 2^attempt]
+    return random.uniform(0, HTTP_BACKOFF * (2 ** attempt))
+
+
+def request(method, url, retries=HTTP_RETRIES, timeout=None, deadline=HTTP_DEADLINE, **kwargs):
+    """Pooled request with per-host concurrency limits, timeouts, jittered retries and a circuit breaker.
+
+    Attempts and backoffs together never run past `deadline` seconds: each
+    attempt's timeouts are cut to the time left, and no retry starts once its
+    backoff would end after it.
+    """
+    if cassette.active:
+        return cassette.call(
+            "http", _exchange(method, url, kwargs),
+            lambda: _buffered(_request(method, url, retries, timeout, deadline, **kwargs)), _encode, _decode)
+    return _request(method, url, retries, timeout, deadline, **kwargs)
+
+
+def _timeouts(timeout):
+    """(connect, read) seconds for a requests-style timeout: None, a number or a pair."""
+    if timeout is None:
+        return HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+def _request(method, url, retries, timeout, deadline=HTTP_DEADLINE, **kwargs):
+    host = _host(url)
+    breaker = _breaker(host)
+    connect, read = _timeouts(timeout)
+    give_up = time.monotonic() + deadline
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        try:
+            with _host_limit(host):
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    raise requests.Timeout(f"{method} {_host(url)} ran past its {deadline:g}s deadline")
+                response = session().request(method, url, timeout=(min(connect, left), min(read, left)), **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record(False)
+            pause = _backoff(attempt)
+            if attempt == retries or time.monotonic() + pause >= give_up:
+                raise
+        else:
+            failed = response.status_code in RETRY_STATUSES
+            breaker.record(not failed)
+            pause = _backoff(attempt)
+            if not failed or attempt == retries or time.monotonic() + pause >= give_up:
+                return response
+            # a streamed response holds its pooled connection until closed
+            response.close()
+        time.sleep(pause)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def _async_session():
+    loop = asyncio.get_running_loop()
+    client = _async_sessions.get(loop)
+    if client is None or client.closed:
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=HTTP_HOST_CONCURRENCY)
+        client = _async_sessions[loop] = aiohttp.ClientSession(connector=connector)
+    return client
+
+
+def _async_host_limit(host):
+    key = (asyncio.get_running_loop(), host)
+    if key not in _async_limits:
+        _async_limits[key] = asyncio.Semaphore(HTTP_HOST_CONCURRENCY)
+    return _async_limits[key]
+
+
+async def a_request(method, url, retries=HTTP_RETRIES, timeout=None, max_bytes=None, deadline=HTTP_DEADLINE,
+                    **kwargs):
+    """Async counterpart of request(), sharing the same breakers and retry policy.
+
+    The body is buffered, streamed in chunks and cut off after `max_bytes` if given.
+    """
+    if cassette.active:
+        return await cassette.a_call(
+            "http", _exchange(method, url, kwargs),
+            lambda: _a_request(method, url, retries, timeout, max_bytes, deadline, **kwargs), _encode, _decode)
+    return await _a_request(method, url, retries, timeout, max_bytes, deadline, **kwargs)
+
+
+async def _a_read(raw, max_bytes):
+    if max_bytes is None:
+        return await raw.read()
+    body = bytearray()
+    async for chunk in raw.content.iter_chunked(64 * 1024):
+        body += chunk[:max_bytes - len(body)]
+        if len(body) >= max_bytes:
+            # the rest is never downloaded: aiohttp closes a connection whose body was not read to the end
+            break
+    return bytes(body)
+
+
+async def _a_request(method, url, retries, timeout, max_bytes=None, deadline=HTTP_DEADLINE, **kwargs):
+    host = _host(url)
+    breaker = _breaker(host)
+    connect, read = _timeouts(timeout)
+    give_up = time.monotonic() + deadline
+    for attempt in range(retries + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        try:
+            async with _async_host_limit(host):
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    raise asyncio.TimeoutError()
+                limits = aiohttp.ClientTimeout(total=left, sock_connect=connect, sock_read=read)
+                async with _async_session().request(method, url, timeout=limits, **kwargs) as raw:
+                    response = BufferedResponse(str(raw.url), raw.status, raw.headers, await _a_read(raw, max_bytes))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            breaker.record(False)
+            pause = _backoff(attempt)
+            if attempt == retries or time.monotonic() + pause >= give_up:
+                raise requests.ConnectionError(str(e) or f"{method} {host} timed out") from e
+        else:
+            failed = response.status_code in RETRY_STATUSES
+            breaker.record(not failed)
+            pause = _backoff(attempt)
+            if not failed or attempt == retries or time.monotonic() + pause >= give_up:
+                return response
+        await asyncio.sleep(pause)
+
+
+async def a_get(url, **kwargs):
+    return await a_request("GET", url, **kwargs)
+
+
+async def a_post(url, **kwargs):
+    return await a_request("POST", url, **kwargs)
+
+
+async def a_head(url, **kwargs):
+    return await a_request("HEAD", url, **kwargs)
+
+
+async def a_close():
+    """Close the aiohttp session bound to the running loop and forget the loop's host limits."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _async_limits if key[0] is loop]:
+        del _async_limits[key]
+    client = _async_sessions.pop(loop, None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+import numpy as np
+from cache import CACHE_DIR, PAGE_CACHE_TTL, canonical_url
+from vectors import vectorize
+from cassette import cassette
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves from parallel processes are not serialized
+    fcntl = None
+
+# where the index is persisted between runs; empty keeps it in memory only
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", os.path.join(CACHE_DIR, "knowledge"))
+KNOWLEDGE_DIMENSIONS = int(os.getenv("KNOWLEDGE_DIMENSIONS", 4096))
+KNOWLEDGE_CHUNK_CHARS = int(os.getenv("KNOWLEDGE_CHUNK_CHARS", 1500))
+KNOWLEDGE_MAX_CHUNKS = int(os.getenv("KNOWLEDGE_MAX_CHUNKS", 50000))
+# pages indexed longer ago than this are dropped, like the page cache entries they came from
+KNOWLEDGE_TTL = int(os.getenv("KNOWLEDGE_TTL", PAGE_CACHE_TTL))
+# retrieval: hits below this cosine score are ignored
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", 5))
+KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", 0.12))
+
+
+def chunk_text(text, size=KNOWLEDGE_CHUNK_CHARS):
+    """Pack paragraphs into chunks of about `size` characters; longer paragraphs are cut on spaces."""
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > size:
+            cut = paragraph.rfind(" ", 0, size)
+            cut = cut if cut > 0 else size
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if current and len(current) + len(paragraph) + 2 > size:
+            chunks.append(current)
+            current = ""
+        if paragraph:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class KnowledgeIndex:
+    """Scraped page chunks embedded with a hashing vectorizer for top-k retrieval.
+
+    Vectors live in one float32 matrix that grows by doubling; a query is a
+    single matrix-vector product. save() writes the matrix as .npy next to a
+    JSONL of chunk metadata, and load() memory-maps it read-only until the
+    next change copies it into memory. Each canonical URL is indexed once per
+    version of its text: a re-scraped page whose text changed replaces its
+    chunks, and pages older than `ttl` are dropped on load and save.
+    """
+
+    def __init__(self, directory=KNOWLEDGE_DIR, dimensions=KNOWLEDGE_DIMENSIONS, max_chunks=KNOWLEDGE_MAX_CHUNKS,
+                 ttl=KNOWLEDGE_TTL):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.max_chunks = max_chunks
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._size = 0
+        self.chunks = []
+        # canonical URL -> digest of the indexed text
+        self.pages = {}
+        # pages added or replaced since the last load or save, which win when merging with disk
+        self._changed = set()
+        self.lookups = 0
+        self.hits = 0
+        if directory:
+            self.load()
+            atexit.register(self.save)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dirty(self):
+        return bool(self._changed)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self):
+        """(vectors, chunks) from disk without the expired pages, or None."""
+        try:
+            vectors = np.load(self._path("vectors.npy"), mmap_mode="r")
+            with open(self._path("chunks.jsonl")) as file:
+                chunks = [json.loads(line) for line in file]
+        except (OSError, ValueError):
+            return None
+        if vectors.shape[1] != self.dimensions or len(vectors) != len(chunks):
+            return None
+        cutoff = time.time() - self.ttl
+        keep = [i for i, chunk in enumerate(chunks) if chunk.get("indexed_at", 0) >= cutoff]
+        if len(keep) < len(chunks):
+            vectors, chunks = vectors[keep], [chunks[i] for i in keep]
+        return vectors, chunks
+
+    def _adopt(self, vectors, chunks):
+        # caller holds the lock
+        self._vectors, self._size, self.chunks = vectors, len(chunks), chunks
+        self.pages = {chunk["key"]: chunk.get("digest") for chunk in chunks}
+
+    def load(self):
+        stored = self._read()
+        if stored is None:
+            return
+        with self._lock:
+            self._adopt(*stored)
+            self._changed.clear()
+
+    def save(self):
+        """Write the index, merged with whatever other processes saved since it was loaded.
+
+        Pages this process added or replaced win; every other page on disk is
+        kept. The read-merge-write runs under an exclusive file lock.
+        """
+        if not self.directory or not self.dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path("lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            stored = self._read()
+            with self._lock:
+                vectors, chunks = self._vectors[:self._size], self.chunks
+                if stored is not None:
+                    mine = [i for i, chunk in enumerate(chunks) if chunk["key"] in self._changed]
+                    theirs = [i for i, chunk in enumerate(stored[1]) if chunk["key"] not in self._changed]
+                    vectors = np.concatenate([stored[0][theirs], vectors[mine]])
+                    chunks = [stored[1][i] for i in theirs] + [chunks[i] for i in mine]
+                # keep the newest chunks when over the cap
+                start = max(0, len(chunks) - self.max_chunks)
+                vectors, chunks = np.ascontiguousarray(vectors[start:]), chunks[start:]
+                # write then rename, so concurrent readers never see a half-written index
+                pid = os.getpid()
+                with open(self._path(f"vectors.{pid}.npy"), "wb") as file:
+                    np.save(file, vectors)
+                with open(self._path(f"chunks.{pid}.jsonl"), "w") as file:
+                    file.writelines(json.dumps(chunk) + "\n" for chunk in chunks)
+                os.replace(self._path(f"vectors.{pid}.npy"), self._path("vectors.npy"))
+                os.replace(self._path(f"chunks.{pid}.jsonl"), self._path("chunks.jsonl"))
+                self._adopt(vectors, chunks)
+                self._changed.clear()
+
+    def add(self, url, text, title=""):
+        """Index a page's text, replacing an older version of it; returns the number of chunks added."""
+        if not text:
+            return 0
+        key = canonical_url(url)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            if self.pages.get(key) == digest:
+                return 0
+            self.pages[key] = digest
+        chunks = chunk_text(text)
+        vectors = vectorize(chunks, self.dimensions)
+        now = time.time()
+        with self._lock:
+            if any(chunk["key"] == key for chunk in self.chunks):
+                # the page changed since it was indexed: drop its old chunks
+                keep = [i for i, chunk in enumerate(self.chunks) if chunk["key"] != key]
+                self._vectors = self._vectors[:self._size][keep]
+                self.chunks = [self.chunks[i] for i in keep]
+                self._size = len(keep)
+            needed = self._size + len(chunks)
+            if needed > len(self._vectors) or not self._vectors.flags.writeable:
+                grown = np.zeros((max(needed, 2 * len(self._vectors), 64), self.dimensions), dtype=np.float32)
+                grown[:self._size] = self._vectors[:self._size]
+                self._vectors = grown
+            self._vectors[self._size:needed] = vectors
+            self._size = needed
+            self.chunks.extend({"key": key, "url": url, "title": title, "text": chunk, "digest": digest,
+                                "indexed_at": now} for chunk in chunks)
+            self._changed.add(key)
+        return len(chunks)
+
+    def search(self, query, k=KNOWLEDGE_TOP_K, min_score=KNOWLEDGE_MIN_SCORE):
+        """Top-k chunks for a query as dicts with url, title, text and score, best first."""
+        with self._lock:
+            vectors, chunks, size = self._vectors, self.chunks, self._size
+            self.lookups += 1
+        if not size:
+            return []
+        scores = vectors[:size] @ vectorize([query], self.dimensions)[0]
+        top = np.argpartition(-scores, min(k, size) - 1)[:k]
+        hits = [{**chunks[i], "score": float(scores[i])}
+                for i in top[np.argsort(-scores[top])] if scores[i] >= min_score]
+        if hits:
+            with self._lock:
+                self.hits += 1
+        return hits
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self.pages), "chunks": self._size, "lookups": self.lookups, "hits": self.hits}
+
+
+def format_hits(hits):
+    return "\n\n".join(f"[{i}] {hit['url']}\n{hit['text']}" for i, hit in enumerate(hits, 1))
+
+
+# a persisted index would change research prompts between recording and replay
+knowledge = KnowledgeIndex(directory="" if cassette.active else KNOWLEDGE_DIR)
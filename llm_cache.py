@@ -0,0 +1,119 @@
+import os
+import threading
+from diskcache import Cache
+from autogen import OpenAIWrapper
+from openai.types.chat import ChatCompletion
+from openai.types.completion import Completion
+from cache import CACHE_DIR, content_key
+from cassette import cassette
+import tracing
+
+# read-through: serve hits and store misses; write-only: always call the model but store; off: bypass
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "read-through")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 512 * 1024 * 1024))
+MODES = ("read-through", "write-only", "off")
+
+# request fields that do not change the completion
+IGNORED_PARAMS = {"stream", "timeout", "user"}
+
+
+class CompletionCache:
+    """Persistent cache of chat completions shared by every agent and process.
+
+    Keys hash the model, messages, function/tool schemas and sampling
+    parameters of the request. Storage is a size-bounded diskcache with LRU
+    eviction; diskcache's SQLite index makes it safe for concurrent processes.
+    """
+
+    def __init__(self, mode=LLM_CACHE_MODE, size_limit=LLM_CACHE_SIZE):
+        if mode not in MODES:
+            raise ValueError(f"LLM_CACHE_MODE must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self._cache = Cache(
+            os.path.join(CACHE_DIR, "completions"),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+
+    @staticmethod
+    def key(params):
+        return content_key("completion", {k: v for k, v in params.items() if k not in IGNORED_PARAMS})
+
+    def get(self, params):
+        if self.mode != "read-through":
+            return None
+        response = self._cache.get(self.key(params))
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                usage = getattr(response, "usage", None)
+                self.saved_prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                self.saved_completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        return response
+
+    def set(self, params, response):
+        if self.mode != "off":
+            self._cache.set(self.key(params), response)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_prompt_tokens": self.saved_prompt_tokens,
+                "saved_completion_tokens": self.saved_completion_tokens,
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"LLM cache ({s['mode']}): {s['hits']} hits / {s['misses']} misses "
+                f"({s['hit_rate']:.0%}), saved {s['saved_prompt_tokens']} prompt + "
+                f"{s['saved_completion_tokens']} completion tokens")
+
+
+completion_cache = CompletionCache()
+_original_create = OpenAIWrapper._completions_create
+
+
+def _recorded_create(self, client, params):
+    response_type = ChatCompletion if "messages" in params else Completion
+    return cassette.call(
+        "llm", {k: v for k, v in params.items() if k not in IGNORED_PARAMS},
+        lambda: _original_create(self, client, params),
+        lambda response: response.model_dump(),
+        lambda data: response_type(**data))
+
+
+def _cached_completions_create(self, client, params):
+    with tracing.span("llm", "llm", model=params.get("model")) as attrs:
+        # like the tool caches, the completion cache steps aside while a cassette is active
+        response = None if cassette.active else completion_cache.get(params)
+        attrs["cache"] = "hit" if response is not None else "miss"
+        if response is None:
+            response = _recorded_create(self, client, params)
+            if not cassette.active:
+                completion_cache.set(params, response)
+        usage = getattr(response, "usage", None)
+        tracing.count(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0)
+        return response
+
+
+def install():
+    """Route every OpenAIWrapper request (all autogen agents) through the completion cache."""
+    OpenAIWrapper._completions_create = _cached_completions_create
+
+
+def report():
+    return completion_cache.report()
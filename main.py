@@ -1,4 +1,9 @@
 import os
+import re
+import sys
+import time
+import uuid
+import asyncio
 import requests
 from bs4 import BeautifulSoup
 import json
@@ -10,22 +15,82 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains.summarize import load_summarize_chain
 from langchain.prompts import PromptTemplate 
 from dotenv import load_dotenv
-from tools import search, scrape, summary, research, write_content, save_markdown
+from tools import search, scrape, summary, research, write_content, a_research, a_write_content, read_artifact
+from artifacts import artifacts
+from groupchat import AgencyGroupChat
+from compaction import ContextCompactor, RECALL_FUNCTION
+from speaker import LocalSelector
+from pipeline import Stage, run_pipeline, a_run_pipeline, transcript
+import pipeline
+from cache import scrape_session, start_scrape_session
+import cache
+from transcript import TranscriptWriter, TRANSCRIPT_DIR
+import http_client
+import llm_cache
+import tracing
+import tools
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 BROWSERLESS_API_KEY = os.getenv("BROWSERLESS_API_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 config_list = config_list_from_json("OAI_CONFIG_LIST")
+# batch runs set this to NEVER so no proxy waits on stdin
+HUMAN_INPUT_MODE = os.getenv("HUMAN_INPUT_MODE", "TERMINATE")
+# local: pick speakers from SPEAKER_TRANSITIONS and agent descriptions, asking the LLM only when unsure; llm: always ask
+SPEAKER_SELECTION = os.getenv("SPEAKER_SELECTION", "local")
+# briefs a_run_many drives at once on one event loop
+AGENCY_CONCURRENCY = int(os.getenv("AGENCY_CONCURRENCY", 8))
 
-brand_task = input("Please enter the brand or company name: ")
-user_task = input("Please enter the your goal, brief, or problem statement: ")
+# who may speak after whom in the agency group chat
+SPEAKER_TRANSITIONS = {
+    "user_proxy": ["Agency_Manager"],
+    "Agency_Manager": ["Agency_Researcher", "Agency_Strategist", "Agency_Copywriter", "writing_assistant",
+                       "Agency_Marketer", "Agency_Media_Planner", "Agency_Director"],
+    "Agency_Researcher": ["Agency_Strategist", "writing_assistant", "Agency_Manager"],
+    "Agency_Strategist": ["Agency_Copywriter", "Agency_Marketer", "Agency_Media_Planner", "Agency_Manager"],
+    "Agency_Copywriter": ["writing_assistant", "Agency_Director", "Agency_Marketer", "Agency_Manager"],
+    "writing_assistant": ["Agency_Copywriter", "Agency_Director", "Agency_Manager"],
+    "Agency_Marketer": ["Agency_Media_Planner", "Agency_Copywriter", "Agency_Director", "Agency_Manager"],
+    "Agency_Media_Planner": ["Agency_Marketer", "Agency_Director", "Agency_Manager"],
+    "Agency_Director": ["Agency_Manager", "Agency_Copywriter", "Agency_Strategist", "user_proxy"],
+}
+
+# chat: free-form group chat; pipeline: AGENCY_STAGES, independent stages running concurrently
+AGENCY_MODE = os.getenv("AGENCY_MODE", "chat")
+
+# pipeline mode: each stage starts once the stages it comes after are done
+AGENCY_STAGES = [
+    Stage("plan", "Agency_Manager",
+          "Outline the project plan: objectives, target audience, deliverables and what each specialist should focus on."),
+    Stage("research", "Agency_Researcher",
+          "Use the research function to gather market trends, audience pain points, competitors and cultural context for the plan.",
+          after=("plan",)),
+    Stage("strategy", "Agency_Strategist",
+          "Write the strategic brief: positioning, key messages and audience targeting, grounded in the research.",
+          after=("research",)),
+    Stage("copy", "Agency_Copywriter",
+          "Write the campaign copy: headline options, core narrative and channel-ready variants in the brand's voice.",
+          after=("strategy",)),
+    Stage("media", "Agency_Media_Planner",
+          "Propose the media mix: channels, timing, budget split and how each channel reaches the audience.",
+          after=("strategy",)),
+    Stage("marketing", "Agency_Marketer",
+          "Design the campaign and launch initiatives that carry the strategy to market.",
+          after=("strategy",)),
+    Stage("review", "Agency_Director",
+          "Review the copy, media plan and marketing campaign together. Resolve inconsistencies and deliver the final consolidated recommendation.",
+          after=("copy", "media", "marketing")),
+]
+
+# roles the local selector hands the turn to as soon as the transitions allow, until they have spoken
+REQUIRED_SPEAKERS = ["Agency_Researcher"]
 
 llm_config_content_assistant = {
     "functions": [
         {
             "name": "research",
-            "description": "research about a given topic, return the research material including reference links",
+            "description": "research about a given topic, return the research material including reference links and an artifact_id for write_content",
             "parameters": {
                     "type": "object",
                     "properties": {
@@ -43,159 +108,352 @@ llm_config_content_assistant = {
             "parameters": {
                     "type": "object",
                     "properties": {
+                        "research_id": {
+                            "type": "string",
+                            "description": "artifact_id returned by research; preferred over copying the research material",
+                        },
                         "research_material": {
                             "type": "string",
-                            "description": "research material of a given topic, including reference links when available",
+                            "description": "research material of a given topic, including reference links when available; only needed without a research_id",
                         },
                         "topic": {
                             "type": "string",
                             "description": "The topic of the content",
                         }
                     },
-                "required": ["research_material", "topic"],
+                "required": ["topic"],
+            },
+        },
+        {
+            "name": "read_artifact",
+            "description": "Read part of a stored research report, scraped page or draft by its artifact_id, e.g. to see the rest of a shortened report",
+            "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "artifact_id": {
+                            "type": "string",
+                            "description": "The artifact_id, e.g. research-0123456789abcdef or page-0123456789abcdef",
+                        },
+                        "start": {
+                            "type": "integer",
+                            "description": "Character offset to start reading at, 0 by default",
+                        },
+                        "length": {
+                            "type": "integer",
+                            "description": "Number of characters to read",
+                        }
+                    },
+                "required": ["artifact_id"],
             },
         },
+        RECALL_FUNCTION,
     ],
-    "config_list": config_list}
-
-agency_manager = AssistantAgent(
-    name="Agency_Manager",
-    description="Outlines plan for agents.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    You are the Project Manager, focusing on {brand_task}. 
-    Outline step-by-step tasks for {user_task} with the team. 
-    Act as a communication hub, maintain high-quality deliverables, and regularly update all stakeholders on progress. 
-    Terminate the conversation with "TERMINATE" when all tasks are completed and no further actions are needed.
-    '''
-)
-
-agency_researcher = AssistantAgent(
-    name="Agency_Researcher",
-    description="Conducts detailed research to provide insights and information vital for executing user-focused tasks.",
-    llm_config=llm_config_content_assistant,
-    system_message=f'''
-    As the Lead Researcher, your primary role revolves around {user_task}. 
-    Utilize the research function to gather in-depth insights about market trends, user pain points, and cultural dynamics relevant to our project. 
-    Provide these insights proactively to support the team's strategy and decision-making. In your responses, focus on delivering clear, actionable information. 
-    Conclude your participation with "TERMINATE" once all relevant research has been provided and no further analysis is required.
-    ''',
-    function_map={
-        "research": research,
-    }
-)
-
-agency_researcher.register_function(
-    function_map={
-        "research": research,
-    }
-)
-
-agency_strategist = AssistantAgent(
-    name="Agency_Strategist",
-    description="Develops strategic briefs based on market analysis and research findings, focusing on brand positioning and audience insights.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    As the Lead Strategist, your key task is to develop strategic briefs for {brand_task}, guided by {user_task} objectives. 
-    Utilize the insights from Agency_Researcher to inform your strategies, focusing on brand positioning, key messaging, and audience targeting. 
-    Ensure your briefs offer unique perspectives and clear direction. 
-    Coordinate closely with the Agency_Manager for alignment with project goals. 
-    Conclude with "TERMINATE" once the strategic direction is established and communicated.
-    '''
-)
-
-agency_writer = AssistantAgent(
-    name="Agency_Copywriter",
-    description="Creates engaging content and narratives aligned with project goals, using insights from research and strategy.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    As the Lead Copywriter, your role is to craft compelling narratives and content.
-    Focus on delivering clear, engaging, and relevant messages that resonate with our target audience. 
-    Use your creativity to transform strategic insights and research findings into impactful content. 
-    Ensure your writing maintains the brand's voice and aligns with the overall project strategy. 
-    Your goal is to create content that effectively communicates our message and engages the audience.
-    ''',
-    function_map={
-        "write_content": write_content,
-    }
-)
-
-writing_assistant = AssistantAgent(
-    name="writing_assistant",
-    description="Versatile assistant skilled in researching various topics and crafting well-written content.",
-    llm_config=llm_config_content_assistant,
-    system_message=f'''
-    As a writing assistant, your role involves using the research function to stay updated on diverse topics and employing the write_content function to produce polished prose. 
-    Ensure your written material is informative and well-structured, catering to the specific needs of the topic. 
-    Conclude your contributions with "TERMINATE" after completing the writing tasks as required.
-    ''',
-    function_map={
-        "research": research,
-        "write_content": write_content,
-    }
-)
-
-agency_marketer = AssistantAgent(
-    name="Agency_Marketer",
-    description="Crafts marketing strategies and campaigns attuned to audience needs, utilizing insights from project research and strategy.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    As the Lead Marketer, utilize insights and strategies to develop marketing ideas that engage our target audience. 
-    For {user_task}, create campaigns and initiatives that clearly convey our brand's value. 
-    Bridge strategy and execution, ensuring our message is impactful and aligned with our vision. 
-    Collaborate with teams for a unified approach, and coordinate with the Agency Manager for project alignment. 
-    Conclude with "TERMINATE" when your marketing contributions are complete.
-    '''
-)
-
-agency_mediaplanner = AssistantAgent(
-    name="Agency_Media_Planner",
-    description="Identifies optimal media channels and strategies for ad delivery, aligned with project goals.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    As the Lead Media Planner, your task is to identify the ideal media mix for delivering our advertising messages, targeting the client's audience. 
-    Utilize the research function to stay updated on current and effective media channels and tactics. 
-    Apply insights from {user_task} to formulate strategies that effectively reach the audience through various media, both traditional and digital. 
-    Collaborate closely with the Agency Manager to ensure your plans are in sync with the broader user strategy. 
-    Conclude your role with "TERMINATE" once the media planning is complete and aligned.
-    '''
-)
-
-agency_director = AssistantAgent(
-    name="Agency_Director",
-    description="Guides the project's creative vision, ensuring uniqueness, excellence, and relevance in all ideas and executions.",
-    llm_config={"config_list": config_list},
-    system_message=f'''
-    As the Creative Director, your role is to oversee the project's creative aspects. 
-    Critically evaluate all work, ensuring each idea is not just unique but also aligns with our standards of excellence. 
-    Encourage the team to innovate and explore new creative avenues. 
-    Collaborate closely with the Agency_Manager for consistent alignment with the user_proxy. 
-    Conclude your guidance with "TERMINATE" once you've ensured the project's creative integrity and alignment.
-    '''
-)
-
-user_proxy = UserProxyAgent(
-   name="user_proxy",
-   description="Acts as a proxy for the user, capable of executing code and handling user interactions within predefined guidelines.",
-   is_termination_msg=lambda msg: "TERMINATE" in msg["content"] if msg["content"] else False,
-   human_input_mode="TERMINATE",
-   max_consecutive_auto_reply=1,
-   code_execution_config={"work_dir": "/logs"},
-   system_message='Be a helpful assistant.',
-)
-
-groupchat = GroupChat(agents=[
-    user_proxy, agency_manager, agency_researcher, agency_strategist, agency_writer, writing_assistant, agency_marketer, agency_mediaplanner, agency_director], 
-    messages=[], 
-    max_round=20
-)
-
-manager = GroupChatManager(
-    groupchat=groupchat, 
-    llm_config={"config_list": config_list}
-)
-
-user_proxy.initiate_chat(
-    manager, 
-    message=user_task,
-)
\ No newline at end of file
+    "config_list": config_list,
+    "cache_seed": None}
+
+def _run_id(brand_task):
+    # unique even for briefs started in the same second by one process
+    slug = re.sub(r"[^a-z0-9]+", "-", brand_task.lower()).strip("-")[:40]
+    return f"transcript-{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:6]}"
+
+
+def build_agency(brand_task, user_task, work_dir="/logs", asynchronous=False, transcript_dir=TRANSCRIPT_DIR):
+    """Create the agency team for one brief; returns (user_proxy, manager, groupchat).
+
+    With asynchronous=True the agents call the async tools, for use with a_initiate_chat.
+    The chat's transcript is written under `transcript_dir`.
+    """
+    research_tool = a_research if asynchronous else research
+    write_content_tool = a_write_content if asynchronous else write_content
+    compactor = ContextCompactor(model=config_list[0].get("model", "gpt-4"))
+    # each brief is its own scrape session, even when several run on one event loop
+    start_scrape_session()
+
+    agency_manager = AssistantAgent(
+        name="Agency_Manager",
+        description="Outlines plan for agents.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        You are the Project Manager, focusing on {brand_task}. 
+        Outline step-by-step tasks for {user_task} with the team. 
+        Act as a communication hub, maintain high-quality deliverables, and regularly update all stakeholders on progress. 
+        Terminate the conversation with "TERMINATE" when all tasks are completed and no further actions are needed.
+        '''
+    )
+
+    agency_researcher = AssistantAgent(
+        name="Agency_Researcher",
+        description="Conducts detailed research to provide insights and information vital for executing user-focused tasks.",
+        llm_config=llm_config_content_assistant,
+        system_message=f'''
+        As the Lead Researcher, your primary role revolves around {user_task}. 
+        Utilize the research function to gather in-depth insights about market trends, user pain points, and cultural dynamics relevant to our project. 
+        Provide these insights proactively to support the team's strategy and decision-making. In your responses, focus on delivering clear, actionable information. 
+        Conclude your participation with "TERMINATE" once all relevant research has been provided and no further analysis is required.
+        ''',
+        function_map={
+            "research": research_tool,
+            "read_artifact": read_artifact,
+            "recall": compactor.recall,
+        }
+    )
+
+    agency_researcher.register_function(
+        function_map={
+            "research": research_tool,
+            "read_artifact": read_artifact,
+            "recall": compactor.recall,
+        }
+    )
+
+    agency_strategist = AssistantAgent(
+        name="Agency_Strategist",
+        description="Develops strategic briefs based on market analysis and research findings, focusing on brand positioning and audience insights.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        As the Lead Strategist, your key task is to develop strategic briefs for {brand_task}, guided by {user_task} objectives. 
+        Utilize the insights from Agency_Researcher to inform your strategies, focusing on brand positioning, key messaging, and audience targeting. 
+        Ensure your briefs offer unique perspectives and clear direction. 
+        Coordinate closely with the Agency_Manager for alignment with project goals. 
+        Conclude with "TERMINATE" once the strategic direction is established and communicated.
+        '''
+    )
+
+    agency_writer = AssistantAgent(
+        name="Agency_Copywriter",
+        description="Creates engaging content and narratives aligned with project goals, using insights from research and strategy.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        As the Lead Copywriter, your role is to craft compelling narratives and content.
+        Focus on delivering clear, engaging, and relevant messages that resonate with our target audience. 
+        Use your creativity to transform strategic insights and research findings into impactful content. 
+        Ensure your writing maintains the brand's voice and aligns with the overall project strategy. 
+        Your goal is to create content that effectively communicates our message and engages the audience.
+        ''',
+        function_map={
+            "write_content": write_content_tool,
+        }
+    )
+
+    writing_assistant = AssistantAgent(
+        name="writing_assistant",
+        description="Versatile assistant skilled in researching various topics and crafting well-written content.",
+        llm_config=llm_config_content_assistant,
+        system_message=f'''
+        As a writing assistant, your role involves using the research function to stay updated on diverse topics and employing the write_content function to produce polished prose. 
+        Ensure your written material is informative and well-structured, catering to the specific needs of the topic. 
+        Conclude your contributions with "TERMINATE" after completing the writing tasks as required.
+        ''',
+        function_map={
+            "research": research_tool,
+            "write_content": write_content_tool,
+            "read_artifact": read_artifact,
+            "recall": compactor.recall,
+        }
+    )
+
+    agency_marketer = AssistantAgent(
+        name="Agency_Marketer",
+        description="Crafts marketing strategies and campaigns attuned to audience needs, utilizing insights from project research and strategy.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        As the Lead Marketer, utilize insights and strategies to develop marketing ideas that engage our target audience. 
+        For {user_task}, create campaigns and initiatives that clearly convey our brand's value. 
+        Bridge strategy and execution, ensuring our message is impactful and aligned with our vision. 
+        Collaborate with teams for a unified approach, and coordinate with the Agency Manager for project alignment. 
+        Conclude with "TERMINATE" when your marketing contributions are complete.
+        '''
+    )
+
+    agency_mediaplanner = AssistantAgent(
+        name="Agency_Media_Planner",
+        description="Identifies optimal media channels and strategies for ad delivery, aligned with project goals.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        As the Lead Media Planner, your task is to identify the ideal media mix for delivering our advertising messages, targeting the client's audience. 
+        Utilize the research function to stay updated on current and effective media channels and tactics. 
+        Apply insights from {user_task} to formulate strategies that effectively reach the audience through various media, both traditional and digital. 
+        Collaborate closely with the Agency Manager to ensure your plans are in sync with the broader user strategy. 
+        Conclude your role with "TERMINATE" once the media planning is complete and aligned.
+        '''
+    )
+
+    agency_director = AssistantAgent(
+        name="Agency_Director",
+        description="Guides the project's creative vision, ensuring uniqueness, excellence, and relevance in all ideas and executions.",
+        llm_config={"config_list": config_list, "cache_seed": None},
+        system_message=f'''
+        As the Creative Director, your role is to oversee the project's creative aspects. 
+        Critically evaluate all work, ensuring each idea is not just unique but also aligns with our standards of excellence. 
+        Encourage the team to innovate and explore new creative avenues. 
+        Collaborate closely with the Agency_Manager for consistent alignment with the user_proxy. 
+        Conclude your guidance with "TERMINATE" once you've ensured the project's creative integrity and alignment.
+        '''
+    )
+
+    user_proxy = UserProxyAgent(
+       name="user_proxy",
+       description="Acts as a proxy for the user, capable of executing code and handling user interactions within predefined guidelines.",
+       is_termination_msg=lambda msg: "TERMINATE" in msg["content"] if msg["content"] else False,
+       human_input_mode=HUMAN_INPUT_MODE,
+       max_consecutive_auto_reply=1,
+       code_execution_config={"work_dir": work_dir},
+       system_message='Be a helpful assistant.',
+    )
+
+    agents = [user_proxy, agency_manager, agency_researcher, agency_strategist, agency_writer, writing_assistant, agency_marketer, agency_mediaplanner, agency_director]
+    groupchat = AgencyGroupChat(agents=agents, 
+        messages=[], 
+        max_round=20,
+        compactor=compactor,
+        selector=LocalSelector(agents, SPEAKER_TRANSITIONS, required=REQUIRED_SPEAKERS) if SPEAKER_SELECTION == "local" else None,
+        transcript=TranscriptWriter(_run_id(brand_task), transcript_dir),
+    )
+
+    tracing.instrument_groupchat(groupchat)
+    manager = GroupChatManager(
+        groupchat=groupchat, 
+        llm_config={"config_list": config_list, "cache_seed": None}
+    )
+
+    tracing.instrument_agent(manager)
+    return user_proxy, manager, groupchat
+
+
+def _totals():
+    """Process-wide counters: for a_run_many these cover every brief, so they are printed once."""
+    print(llm_cache.report())
+    print(cache.report())
+    for pool in (tools.research_pool, tools.a_research_pool, tools.writing_pool):
+        print(pool.report())
+    print(artifacts.report())
+
+
+def _report(groupchat, export=True, trace_dir=None):
+    if groupchat.transcript is not None:
+        groupchat.transcript.close()
+        print(groupchat.transcript.report())
+    print(groupchat.compactor.report())
+    print(scrape_session().report())
+    if groupchat.selector is not None:
+        print(groupchat.selector.report())
+    if not export:
+        # a_run_many prints the process totals and exports the trace once for all its briefs
+        return
+    _totals()
+    if tracing.enabled():
+        if trace_dir:
+            trace_path, metrics_path = tracing.export(trace_dir, "trace")
+        else:
+            trace_path, metrics_path = tracing.export(prefix=time.strftime("trace-%Y%m%d-%H%M%S"))
+        print(f"Trace written to {trace_path} and {metrics_path}")
+        tracing.reset()
+
+
+def _brief(brand_task, user_task):
+    return f"Brand: {brand_task}\nBrief: {user_task}"
+
+
+def _record_stages(groupchat, brand_task, user_task, stages, results):
+    print(pipeline.report(stages, results))
+    for message in transcript(_brief(brand_task, user_task), results):
+        groupchat.append(message)
+
+
+def run_agency(agency, brand_task, user_task, mode=None, stages=AGENCY_STAGES, trace_dir=None):
+    """Run an agency from build_agency() on its brief, print the run's reports and return its messages.
+
+    `mode` is "chat" or "pipeline" (default AGENCY_MODE). Messages accumulate
+    in groupchat.messages as they are produced, so callers keep partial
+    transcripts of failed runs.
+    """
+    user_proxy, manager, groupchat = agency
+    try:
+        if (mode or AGENCY_MODE) == "pipeline":
+            results = run_pipeline(stages, groupchat.agents, _brief(brand_task, user_task))
+            _record_stages(groupchat, brand_task, user_task, stages, results)
+        else:
+            user_proxy.initiate_chat(
+                manager,
+                message=user_task,
+            )
+    finally:
+        # a failed run still flushes and closes its transcript, and reports what it got through
+        _report(groupchat, trace_dir=trace_dir)
+    return groupchat.messages
+
+
+async def a_run_agency(agency, brand_task, user_task, mode=None, stages=AGENCY_STAGES, export=True):
+    """Async counterpart of run_agency(), for an agency built with asynchronous=True."""
+    user_proxy, manager, groupchat = agency
+    try:
+        if (mode or AGENCY_MODE) == "pipeline":
+            results = await a_run_pipeline(stages, groupchat.agents, _brief(brand_task, user_task))
+            _record_stages(groupchat, brand_task, user_task, stages, results)
+        else:
+            await user_proxy.a_initiate_chat(
+                manager,
+                message=user_task,
+            )
+    finally:
+        _report(groupchat, export)
+    return groupchat.messages
+
+
+def run_stages(brand_task, user_task, work_dir="/logs", stages=AGENCY_STAGES):
+    """Run the agency as a stage pipeline for one brief and return its transcript."""
+    agency = build_agency(brand_task, user_task, work_dir)
+    return run_agency(agency, brand_task, user_task, "pipeline", stages)
+
+
+async def a_run_stages(brand_task, user_task, work_dir="/logs", stages=AGENCY_STAGES, export=True):
+    """Async counterpart of run_stages()."""
+    agency = build_agency(brand_task, user_task, work_dir, asynchronous=True)
+    try:
+        return await a_run_agency(agency, brand_task, user_task, "pipeline", stages, export)
+    finally:
+        await http_client.a_close()
+
+
+def run(brand_task, user_task, work_dir="/logs"):
+    """Run the agency for one brief (group chat, or pipeline with AGENCY_MODE=pipeline) and return its messages."""
+    return run_agency(build_agency(brand_task, user_task, work_dir), brand_task, user_task)
+
+
+async def a_run(brand_task, user_task, work_dir="/logs", export=True):
+    """Async counterpart of run(): the chat, its tools and their fetches share the running event loop."""
+    agency = build_agency(brand_task, user_task, work_dir, asynchronous=True)
+    try:
+        return await a_run_agency(agency, brand_task, user_task, export=export)
+    finally:
+        # the loop's aiohttp session would otherwise be left open ("Unclosed client session")
+        await http_client.a_close()
+
+
+async def a_run_many(briefs, work_dir="/logs", concurrency=AGENCY_CONCURRENCY):
+    """Run (brand, brief) pairs on one event loop, at most `concurrency` at a time; returns their messages."""
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(brand_task, user_task):
+        async with limit:
+            # not a_run(): the briefs share the loop's HTTP session, closed once they are all done
+            agency = build_agency(brand_task, user_task, work_dir, asynchronous=True)
+            return await a_run_agency(agency, brand_task, user_task, export=False)
+
+    try:
+        return await asyncio.gather(*(one(brand, brief) for brand, brief in briefs))
+    finally:
+        await http_client.a_close()
+        _totals()
+        if tracing.enabled():
+            tracing.export(prefix=time.strftime("trace-%Y%m%d-%H%M%S"))
+            tracing.reset()
+
+
+if __name__ == "__main__":
+    brand_task = input("Please enter the brand or company name: ")
+    user_task = input("Please enter the your goal, brief, or problem statement: ")
+    if "--async" in sys.argv:
+        asyncio.run(a_run(brand_task, user_task))
+    else:
+        run(brand_task, user_task)
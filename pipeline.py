@@ -0,0 +1,203 @@
+import os
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from results import extract_result
+import tracing
+
+# replies (LLM answers and function calls) one agent may take to finish a stage
+PIPELINE_STAGE_TURNS = int(os.getenv("PIPELINE_STAGE_TURNS", 6))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 4))
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline: `agent` carries out `task` once every stage in `after` is done."""
+
+    name: str
+    agent: str
+    task: str
+    after: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageResult:
+    name: str
+    agent: str
+    output: str
+    rounds: int
+    started: float
+    finished: float
+
+    @property
+    def seconds(self):
+        return self.finished - self.started
+
+
+def validate(stages):
+    """Check names are unique, dependencies exist and there is no cycle; returns stages by name."""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"duplicate stage {stage.name!r}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dep in stage.after:
+            if dep not in by_name:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage {dep!r}")
+    depth(stages)
+    return by_name
+
+
+def depth(stages):
+    """Number of stages on the longest dependency chain, i.e. the turns on the critical path."""
+    by_name = {stage.name: stage for stage in stages}
+    levels, visiting = {}, set()
+
+    def level(name):
+        if name not in levels:
+            if name in visiting:
+                raise ValueError(f"dependency cycle through stage {name!r}")
+            visiting.add(name)
+            levels[name] = 1 + max((level(dep) for dep in by_name[name].after), default=0)
+            visiting.discard(name)
+        return levels[name]
+
+    return max((level(stage.name) for stage in stages), default=0)
+
+
+def _ancestors(name, by_name):
+    """Every stage `name` depends on, directly or not, in declaration order."""
+    found, pending = set(), list(by_name[name].after)
+    while pending:
+        dep = pending.pop()
+        if dep not in found:
+            found.add(dep)
+            pending.extend(by_name[dep].after)
+    return [n for n in by_name if n in found]
+
+
+def _stage_prompt(stage, brief, by_name, results):
+    parts = [brief]
+    for dep in _ancestors(stage.name, by_name):
+        parts.append(f"## {dep} ({results[dep].agent})\n{results[dep].output}")
+    parts.append(f"Your task ({stage.name}): {stage.task}\n"
+                 f"Reply with your complete deliverable and end it with TERMINATE.")
+    return "\n\n".join(parts)
+
+
+def _step(messages, reply):
+    """Append an agent reply; returns False once the stage is finished."""
+    if reply is None:
+        return False
+    if isinstance(reply, str):
+        reply = {"content": reply}
+    message = {**reply, "role": reply.get("role", "assistant")}
+    if message["role"] == "assistant" and not message.get("function_call"):
+        message.setdefault("content", "")
+    messages.append(message)
+    # function calls are executed by the agent on its next reply, results are answered
+    return bool(message.get("function_call")) or message["role"] == "function"
+
+
+def _output(messages):
+    """The agent's deliverable, or failing that its last words or tool result."""
+    replies = [m for m in messages if m["role"] == "assistant"]
+    return extract_result(replies) or next(
+        (m["content"].replace("TERMINATE", "").strip() for m in reversed(messages[1:]) if m.get("content")), "")
+
+
+def _start(stage, brief, by_name, results):
+    return [{"role": "user", "content": _stage_prompt(stage, brief, by_name, results)}]
+
+
+def _finish(stage, messages, started):
+    rounds = sum(m["role"] == "assistant" for m in messages)
+    return StageResult(stage.name, stage.agent, _output(messages), rounds, started, time.perf_counter())
+
+
+def run_stage(stage, agent, brief, by_name, results, turns=PIPELINE_STAGE_TURNS):
+    started = time.perf_counter()
+    with tracing.span(f"stage:{stage.name}", "pipeline", agent=stage.agent) as attrs:
+        messages = _start(stage, brief, by_name, results)
+        for _ in range(turns):
+            if not _step(messages, agent.generate_reply(messages=messages)):
+                break
+        result = _finish(stage, messages, started)
+        attrs["rounds"] = result.rounds
+    return result
+
+
+async def a_run_stage(stage, agent, brief, by_name, results, turns=PIPELINE_STAGE_TURNS):
+    started = time.perf_counter()
+    with tracing.span(f"stage:{stage.name}", "pipeline", agent=stage.agent) as attrs:
+        messages = _start(stage, brief, by_name, results)
+        for _ in range(turns):
+            if not _step(messages, await agent.a_generate_reply(messages=messages)):
+                break
+        result = _finish(stage, messages, started)
+        attrs["rounds"] = result.rounds
+    return result
+
+
+def run_pipeline(stages, agents, brief, workers=PIPELINE_WORKERS):
+    """Run each stage as soon as its dependencies are done, up to `workers` at a time.
+
+    `agents` are looked up by the stages' agent names. Each stage's agent sees
+    the brief plus the outputs of every stage it depends on. Returns the
+    StageResults by stage name, in completion order.
+    """
+    by_name = validate(stages)
+    agents = {agent.name: agent for agent in agents}
+    results, running = {}, {}
+    with tracing.span("pipeline", "pipeline", stages=len(stages), depth=depth(stages)):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while len(results) < len(stages):
+                for stage in stages:
+                    if (stage.name not in results and stage.name not in running
+                            and all(dep in results for dep in stage.after)):
+                        # stage spans nest under the pipeline span
+                        running[stage.name] = pool.submit(tracing.bind(run_stage), stage, agents[stage.agent],
+                                                          brief, by_name, dict(results))
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name, future in list(running.items()):
+                    if future in done:
+                        results[name] = future.result()
+                        del running[name]
+    return results
+
+
+async def a_run_pipeline(stages, agents, brief, workers=PIPELINE_WORKERS):
+    """Async counterpart of run_pipeline(): every stage is a task awaiting its dependencies."""
+    by_name = validate(stages)
+    agents = {agent.name: agent for agent in agents}
+    limit = asyncio.Semaphore(workers)
+    results, tasks = {}, {}
+
+    async def run(stage):
+        await asyncio.gather(*(tasks[dep] for dep in stage.after))
+        async with limit:
+            results[stage.name] = await a_run_stage(stage, agents[stage.agent], brief, by_name, dict(results))
+
+    with tracing.span("pipeline", "pipeline", stages=len(stages), depth=depth(stages)):
+        for stage in stages:
+            tasks[stage.name] = asyncio.ensure_future(run(stage))
+        await asyncio.gather(*tasks.values())
+    return results
+
+
+def transcript(brief, results):
+    """The stage outputs as group chat style messages, for saving and comparison with chat mode."""
+    messages = [{"role": "user", "name": "user_proxy", "content": brief}]
+    messages += [{"role": "user", "name": r.agent, "content": r.output} for r in results.values()]
+    return messages
+
+
+def report(stages, results):
+    rounds = sum(r.rounds for r in results.values())
+    stage_seconds = sum(r.seconds for r in results.values())
+    wall = max(r.finished for r in results.values()) - min(r.started for r in results.values())
+    return (f"Pipeline: {len(results)} stages, critical path {depth(stages)} stages, {rounds} rounds, "
+            f"{wall:.1f}s wall for {stage_seconds:.1f}s of stage time")
@@ -0,0 +1,109 @@
+import os
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional
+
+# shorter messages are sign-offs ("Thanks! TERMINATE"), not deliverables
+RESULT_MIN_CHARS = int(os.getenv("RESULT_MIN_CHARS", 200))
+# longer research is shown up to here, with the rest left in the artifact store
+RESULT_INLINE_CHARS = int(os.getenv("RESULT_INLINE_CHARS", 4000))
+# drafts are shown up to here: the chat only needs a preview and the handle to cite
+DRAFT_PREVIEW_CHARS = int(os.getenv("DRAFT_PREVIEW_CHARS", 800))
+
+
+def _content(message):
+    if message.get("function_call"):
+        return ""
+    return message.get("content") or ""
+
+
+def extract_result(messages, marker="TERMINATE", min_chars=RESULT_MIN_CHARS):
+    """The final deliverable among an author's messages, or None if there is none.
+
+    The newest message carrying `marker` is the finished result; when that
+    message only signs off, the newest substantial message before it is.
+    Without a marker (e.g. the chat hit max_round) the newest substantial
+    message is used. Function calls never count as deliverables.
+    """
+    end = len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        if marker in _content(messages[i]):
+            end = i + 1
+            break
+    for message in reversed(messages[:end]):
+        text = _content(message).replace(marker, "").strip()
+        if len(text) >= min_chars:
+            return text
+    return None
+
+
+@dataclass
+class Source:
+    url: str
+    title: str = ""
+    # scraped by the researcher, as opposed to only cited in the findings
+    scraped: bool = False
+    fetched_at: Optional[float] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    chars: int = 0
+    # the scraped text in the artifact store
+    artifact_id: Optional[str] = None
+
+
+def preview(text, artifact_id, limit):
+    """`text` cut at a line break before `limit`, pointing at read_artifact for the rest."""
+    if len(text) <= limit:
+        return text
+    cut = text.rfind("\n", 0, limit)
+    cut = cut if cut > 0 else limit
+    return text[:cut] + f"\n[{len(text) - cut} more characters: read_artifact('{artifact_id}', start={cut})]"
+
+
+@dataclass
+class ResearchResult:
+    """What research() returns: the report, its deduplicated sources and the artifact ID it is stored under."""
+
+    query: str
+    findings: str
+    sources: List[Source] = field(default_factory=list)
+    artifact_id: Optional[str] = None
+
+    def material(self):
+        """Findings plus source list, as handed to the writing team."""
+        if not self.sources:
+            return self.findings
+        lines = [f"- {s.title + ': ' if s.title else ''}{s.url}" for s in self.sources]
+        return self.findings + "\n\nSources:\n" + "\n".join(lines)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{**data, "sources": [Source(**s) for s in data.get("sources", [])]})
+
+    def __str__(self):
+        # this is what the calling agent sees as the function result
+        text = self.material()
+        if not self.artifact_id:
+            return text
+        text = preview(text, self.artifact_id, RESULT_INLINE_CHARS)
+        pages = [f"{s.artifact_id} ({s.url})" for s in self.sources if s.artifact_id]
+        if pages:
+            text += "\n\nScraped pages (read_artifact for the full text): " + ", ".join(pages)
+        return text + (f"\n\nartifact_id: {self.artifact_id} (pass it to write_content as research_id "
+                       f"instead of copying this report)")
+
+
+@dataclass
+class Draft:
+    """What write_content() returns: the writer's draft and the artifact ID it is stored under."""
+
+    topic: str
+    text: str
+    artifact_id: str
+
+    def __str__(self):
+        # the calling agent sees a preview; the full draft stays in the artifact store
+        return (preview(self.text, self.artifact_id, DRAFT_PREVIEW_CHARS)
+                + f"\n\nartifact_id: {self.artifact_id} (read_artifact for the full draft)")
@@ -0,0 +1,130 @@
+import os
+import re
+import threading
+import numpy as np
+from vectors import vectorize
+
+# below this score margin between the two best candidates the LLM picks instead
+SPEAKER_MIN_MARGIN = float(os.getenv("SPEAKER_MIN_MARGIN", 0.05))
+# hashing-vectorizer width
+SPEAKER_DIMENSIONS = int(os.getenv("SPEAKER_DIMENSIONS", 2048))
+# score added for being named in the last message or for not having spoken yet,
+# and taken off per recent turn spoken
+MENTION_BONUS = 0.5
+UNSPOKEN_BONUS = 0.3
+RECENT_PENALTY = 0.2
+RECENT_TURNS = 6
+
+
+def executor(last_speaker, messages, agents):
+    """The agent that should run a pending function call, or None when there is no call.
+
+    The caller runs its own call when it can; otherwise the only agent able to
+    run it does. With several able agents and none of them the caller, the
+    choice is left to the usual selection.
+    """
+    if not messages or not messages[-1].get("function_call"):
+        return None
+    name = messages[-1]["function_call"]["name"]
+    if last_speaker.can_execute_function(name):
+        return last_speaker
+    able = [agent for agent in agents if agent.can_execute_function(name)]
+    return able[0] if len(able) == 1 else None
+
+
+def caller(last_speaker, messages, agents):
+    """Whose turn the chat continues: after a function result, the agent that made the call."""
+    if not messages or messages[-1].get("role") != "function":
+        return last_speaker
+    for message in reversed(messages[:-1]):
+        if message.get("function_call"):
+            return next((agent for agent in agents if agent.name == message.get("name")), last_speaker)
+    return last_speaker
+
+
+class LocalSelector:
+    """Pick the next group chat speaker without an LLM call.
+
+    Candidates are the agents the declared transition graph allows after the
+    last speaker, or after a function result the agent that called the
+    function, whichever agent executed it. A `required` agent that has not spoken yet is chosen as soon
+    as it is a candidate, so roles the rest of the chat depends on (research)
+    are never skipped. Otherwise each candidate is scored by cosine similarity
+    between the last message and its name and description, plus a bonus when
+    the message names it (or its role, e.g. "researcher") or when it has not
+    spoken yet, and a penalty for having just spoken. When the best two scores
+    are closer than `min_margin` the selection is left to the LLM, and the
+    fallback is counted.
+    """
+
+    def __init__(self, agents, transitions=None, min_margin=SPEAKER_MIN_MARGIN, dimensions=SPEAKER_DIMENSIONS,
+                 required=()):
+        self.names = [agent.name for agent in agents]
+        self.transitions = transitions or {}
+        self.required = list(required)
+        self.mentions = {agent.name: re.compile(
+            r"(?<!\w)(" + re.escape(agent.name) + "|" + re.escape(agent.name.replace("_", " ")) + "|"
+            + re.escape(agent.name.split("_")[-1]) + r")(?!\w)", re.I) for agent in agents}
+        self.min_margin = min_margin
+        self.dimensions = dimensions
+        profiles = [f"{agent.name.replace('_', ' ')} {agent.description}" for agent in agents]
+        self.profiles = vectorize(profiles, dimensions)
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallbacks = 0
+
+    def candidates(self, last_speaker, agents):
+        allowed = self.transitions.get(last_speaker.name)
+        if allowed is None:
+            return agents
+        return [agent for agent in agents if agent.name in allowed] or agents
+
+    def scores(self, messages, candidates):
+        text = (messages[-1].get("content") or "") if messages else ""
+        rows = [self.names.index(agent.name) for agent in candidates]
+        scores = self.profiles[rows] @ vectorize([text], self.dimensions)[0]
+        spoken = {m.get("name") for m in messages}
+        for i, agent in enumerate(candidates):
+            if self.mentions[agent.name].search(text):
+                scores[i] += MENTION_BONUS
+            if agent.name not in spoken:
+                scores[i] += UNSPOKEN_BONUS
+            recent = sum(m.get("name") == agent.name for m in messages[-RECENT_TURNS:])
+            scores[i] -= RECENT_PENALTY * recent
+        return scores
+
+    def _required(self, messages, candidates):
+        spoken = {m.get("name") for m in messages}
+        names = {agent.name: agent for agent in candidates}
+        return next((names[name] for name in self.required if name in names and name not in spoken), None)
+
+    def select(self, last_speaker, messages, agents):
+        """The next speaker, or None when the LLM should decide."""
+        candidates = self.candidates(caller(last_speaker, messages, agents), agents)
+        choice = self._required(messages, candidates)
+        if choice is not None or len(candidates) == 1:
+            choice = choice or candidates[0]
+        else:
+            scores = self.scores(messages, candidates)
+            first, second = np.argsort(scores)[::-1][:2]
+            choice = candidates[first] if scores[first] - scores[second] >= self.min_margin else None
+        with self._lock:
+            if choice is None:
+                self.fallbacks += 1
+            else:
+                self.local += 1
+        return choice
+
+    def stats(self):
+        with self._lock:
+            total = self.local + self.fallbacks
+            return {
+                "local": self.local,
+                "fallbacks": self.fallbacks,
+                "fallback_rate": self.fallbacks / total if total else 0.0,
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"Speaker selection: {s['local']} local / {s['fallbacks']} LLM fallbacks "
+                f"({s['fallback_rate']:.0%} fallback rate)")
@@ -0,0 +1,161 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from langchain.chat_models import ChatOpenAI
+from cache import summary_cache, content_key
+from cassette import cassette
+from chunking import ChunkPlanner
+import tracing
+
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-3.5-turbo-1106")
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+SUMMARY_MAX_LEVELS = 3
+
+MAP_PROMPT = """
+Write a detailed summary of the following text for a research purpose:
+"{text}"
+SUMMARY:
+"""
+
+
+class Summarizer:
+    """Map-reduce summarization with a concurrent map phase and a hierarchical reduce.
+
+    Chunks are summarized in parallel (at most `concurrency` LLM calls in
+    flight). Chunks are sized in tokens to the model's context window by a
+    ChunkPlanner. If the partial summaries together exceed that budget they are
+    grouped and summarized again, level by level, until one final call fits.
+
+    Every call is memoized under a hash of the model, prompt and input text,
+    so a re-scraped page only pays for the chunks that changed, and the
+    reduce is free when all of its partials came back unchanged.
+    """
+
+    def __init__(self, llm=None, concurrency=SUMMARY_CONCURRENCY, prompt=MAP_PROMPT,
+                 cache=summary_cache):
+        self.llm = llm or ChatOpenAI(temperature=0, model=SUMMARY_MODEL)
+        self.cache = cache
+        self.concurrency = concurrency
+        self.prompt = prompt
+        self.planner = ChunkPlanner(getattr(self.llm, "model_name", SUMMARY_MODEL), prompt)
+
+    def split(self, content):
+        return self.planner.split(content)
+
+    def needs_summary(self, content):
+        return self.planner.needs_summary(content)
+
+    def _key(self, text):
+        return content_key("summary", {
+            "model": getattr(self.llm, "model_name", ""),
+            "prompt": self.prompt,
+            "text": text,
+        })
+
+    def _summarize(self, text):
+        """Return (summary, cached) for one chunk or group of partials."""
+        key = self._key(text)
+        output = self.cache.get(key) if self.cache else None
+        if output is not None:
+            return output, True
+        prompt = self.prompt.format(text=text)
+        output = cassette.call(
+            "summary", {"model": getattr(self.llm, "model_name", ""), "prompt": prompt},
+            lambda: self.llm.predict(prompt))
+        if self.cache:
+            self.cache.set(key, output)
+        return output, False
+
+    async def _a_summarize(self, text):
+        key = self._key(text)
+        output = self.cache.get(key) if self.cache else None
+        if output is not None:
+            return output, True
+        prompt = self.prompt.format(text=text)
+        output = await cassette.a_call(
+            "summary", {"model": getattr(self.llm, "model_name", ""), "prompt": prompt},
+            lambda: self.llm.apredict(prompt))
+        if self.cache:
+            self.cache.set(key, output)
+        return output, False
+
+    def _map(self, stage, texts, timings):
+        def call(indexed):
+            i, text = indexed
+            start = time.perf_counter()
+            output, cached = self._summarize(text)
+            timings.append({
+                "stage": stage,
+                "index": i,
+                "tokens": self.planner.count(text),
+                "seconds": time.perf_counter() - start,
+                "cached": cached,
+            })
+            return output
+
+        if len(texts) == 1:
+            return [call((0, texts[0]))]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(texts))) as pool:
+            futures = [pool.submit(tracing.bind(call), item) for item in enumerate(texts)]
+            return [future.result() for future in futures]
+
+    async def _a_map(self, stage, texts, timings):
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def call(i, text):
+            async with limit:
+                start = time.perf_counter()
+                output, cached = await self._a_summarize(text)
+            timings.append({
+                "stage": stage,
+                "index": i,
+                "tokens": self.planner.count(text),
+                "seconds": time.perf_counter() - start,
+                "cached": cached,
+            })
+            return output
+
+        return await asyncio.gather(*(call(i, text) for i, text in enumerate(texts)))
+
+    def summarize(self, content):
+        """Return (summary, timings); timings holds one entry per chunk or reduce call."""
+        timings = []
+        chunks = self.split(content)
+        if not chunks:
+            return "", timings
+        partials = self._map("map", chunks, timings)
+        level = 0
+        while len(partials) > 1:
+            level += 1
+            groups = self.planner.group(partials)
+            if len(groups) == 1 or level > SUMMARY_MAX_LEVELS:
+                return self._map("reduce", ["\n\n".join(partials)], timings)[0], timings
+            partials = self._map(f"reduce-{level}", groups, timings)
+        return partials[0], timings
+
+    async def a_summarize(self, content):
+        """Async counterpart of summarize(); map calls share the event loop instead of a thread pool."""
+        timings = []
+        chunks = self.split(content)
+        if not chunks:
+            return "", timings
+        partials = await self._a_map("map", chunks, timings)
+        level = 0
+        while len(partials) > 1:
+            level += 1
+            groups = self.planner.group(partials)
+            if len(groups) == 1 or level > SUMMARY_MAX_LEVELS:
+                return (await self._a_map("reduce", ["\n\n".join(partials)], timings))[0], timings
+            partials = await self._a_map(f"reduce-{level}", groups, timings)
+        return partials[0], timings
+
+
+_summarizer = None
+
+
+def get_summarizer():
+    global _summarizer
+    if _summarizer is None:
+        _summarizer = Summarizer()
+    return _summarizer
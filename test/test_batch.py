@@ -0,0 +1,25 @@
+import os
+
+import artifacts
+from artifacts import ArtifactStore
+from batch import _write_outputs
+from results import Draft
+
+
+def test_run_outputs_keep_the_full_drafts(tmp_path, monkeypatch):
+    store = ArtifactStore(directory="")
+    monkeypatch.setattr(artifacts, "artifacts", store)
+    text = "Spring is the season for first hikes.\n\n" + "Pick light boots. " * 100
+    draft = Draft("First hike", text, store.put("draft", {"topic": "First hike", "text": text}))
+    messages = [
+        {"role": "user", "name": "user_proxy", "content": "Write the launch blog."},
+        {"role": "function", "name": "write_content", "content": str(draft)},
+        {"role": "user", "name": "Agency_Copywriter", "content": f"Done, see {draft.artifact_id}. TERMINATE"},
+    ]
+    _write_outputs(str(tmp_path), messages)
+    with open(os.path.join(tmp_path, "drafts", f"{draft.artifact_id}.md")) as file:
+        assert file.read() == text
+    with open(os.path.join(tmp_path, "deliverables.md")) as file:
+        deliverables = file.read()
+    assert f"### First hike ({draft.artifact_id})" in deliverables
+    assert text.strip() in deliverables
@@ -0,0 +1,17 @@
+from cache import canonical_url
+
+
+def test_tracking_params_are_stripped():
+    assert (canonical_url("http://Example.com:80/trails/?utm_source=x&gclid=1&b=2&a=1#top")
+            == canonical_url("https://example.com/trails?a=1&b=2")
+            == "https://example.com/trails?a=1&b=2")
+    assert canonical_url("https://example.com/?fbclid=abc&ref_src=twsrc") == "https://example.com/"
+
+
+def test_content_params_are_kept():
+    dev = canonical_url("https://api.github.com/repos/o/r/contents/x?ref=dev")
+    main = canonical_url("https://api.github.com/repos/o/r/contents/x?ref=main")
+    assert dev != main
+    assert dev == "https://api.github.com/repos/o/r/contents/x?ref=dev"
+    assert canonical_url("https://shop.example/item?spm=a2.b&id=7") == "https://shop.example/item?id=7&spm=a2.b"
+    assert canonical_url("https://example.com/search?q=boots&page=2") != canonical_url("https://example.com/search?q=boots")
@@ -0,0 +1,60 @@
+import gzip
+import json
+import threading
+
+import pytest
+
+import http_client
+from bench.stubs import StubServer
+from cassette import Cassette, CassetteMiss, redact_url
+
+
+@pytest.fixture
+def server():
+    server = StubServer("instant")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def use(monkeypatch, path, mode):
+    tape = Cassette(str(path), mode)
+    monkeypatch.setattr(http_client, "cassette", tape)
+    return tape
+
+
+def test_redact_url():
+    assert redact_url("https://x.io/a?q=1&token=abc&apiKey=def") == "https://x.io/a?q=1&token=-&apiKey=-"
+    assert redact_url("https://x.io/a?q=token") == "https://x.io/a?q=token"
+
+
+def test_record_then_replay_offline(server, monkeypatch, tmp_path):
+    path = tmp_path / "tape.jsonl.gz"
+    tape = use(monkeypatch, path, "record")
+    url = f"{server.url}/page/1"
+    recorded = http_client.request("GET", f"{url}?token=secret")
+    assert recorded.status_code == 200 and "<main>" in recorded.text
+    tape.close()
+    assert tape.recorded == 1 and server.snapshot()["page_requests"] == 1
+
+    # the stored URL carries no credential (the stub echoes the path into its body, which is kept verbatim)
+    with gzip.open(path, "rt") as file:
+        entry = json.loads(file.readline())
+    assert entry["response"]["url"] == f"{url}?token=-"
+
+    server.shutdown()
+    tape = use(monkeypatch, path, "replay")
+    # URL credentials are not part of the key, so another token replays the same exchange
+    replayed = http_client.request("GET", f"{url}?token=other")
+    assert (replayed.status_code, replayed.text) == (recorded.status_code, recorded.text)
+    assert replayed.headers["ETag"] == recorded.headers["ETag"]
+    assert tape.replayed == 1 and server.snapshot()["page_requests"] == 1
+
+
+def test_replay_miss_raises(monkeypatch, tmp_path):
+    path = tmp_path / "tape.jsonl.gz"
+    use(monkeypatch, path, "record").close()
+    use(monkeypatch, path, "replay")
+    with pytest.raises(CassetteMiss):
+        http_client.request("GET", "http://127.0.0.1:9/page/1")
@@ -0,0 +1,38 @@
+from chunking import ChunkPlanner
+
+
+def planner(budget=300):
+    planner = ChunkPlanner("gpt-3.5-turbo")
+    planner.budget = budget
+    return planner
+
+
+def test_overlap_depends_only_on_the_budget():
+    p = planner(1000)
+    assert p.plan(800) == (1000, 0)
+    assert p.plan(2900) == p.plan(2950) == p.plan(9000) == (1000, 50)
+
+
+def page(paragraphs=40):
+    return "\n\n".join(
+        f"Paragraph {i} covers trail {i}. It is {i % 7 + 2} miles long and climbs {i * 37 % 500} feet. "
+        f"Hikers rate it {i % 5 + 1} stars for views, shade and parking near the trailhead." for i in range(paragraphs))
+
+
+def test_chunks_fit_the_budget():
+    p = planner()
+    chunks = p.split(page())
+    assert len(chunks) > 3
+    assert all(p.count(chunk) <= p.budget for chunk in chunks)
+    assert p.split("short page") == ["short page"]
+
+
+def test_edit_only_invalidates_the_chunks_it_touches():
+    p = planner()
+    text = page()
+    edited = text.replace("Paragraph 3 covers", "A new sentence about parking. Paragraph 3 covers")
+    before, after = p.split(text), p.split(edited)
+    reused = [chunk for chunk in after if chunk in before]
+    # the edited chunk and, through its overlap, the one after it may change; the rest are reused
+    assert len(reused) >= len(after) - 2
+    assert after[-1] == before[-1]
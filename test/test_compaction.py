@@ -0,0 +1,77 @@
+import re
+from types import SimpleNamespace
+
+from compaction import ContextCompactor, RECALL_FUNCTION
+
+
+def turn(name, words, role="user"):
+    return {"role": role, "name": name, "content": " ".join(f"{name.lower()}{i}" for i in range(words))}
+
+
+def chat():
+    messages = [turn("user_proxy", 40)]
+    for i in range(6):
+        messages.append(turn("Agency_Manager", 120))
+        messages.append({"role": "assistant", "name": "Agency_Researcher", "content": None,
+                         "function_call": {"name": "research", "arguments": f'{{"query": "trend {i}"}}'}})
+        messages.append(turn("research", 400, role="function"))
+    messages.append(turn("Agency_Strategist", 80))
+    return messages
+
+
+def test_fitting_history_is_sent_unchanged():
+    compactor = ContextCompactor(budget=100000)
+    messages = chat()
+    assert compactor.compact(messages) is messages
+
+
+def test_compacted_history_fits_the_budget():
+    compactor = ContextCompactor(budget=1500, keep_recent=4)
+    messages = chat()
+    compacted = compactor.compact(messages)
+    assert compactor.total(messages) > 1500 >= compactor.total(compacted)
+    assert compacted[0] == messages[0]
+    assert compacted[-1] == messages[-1]
+    assert compacted[1]["role"] == "system" and "Summary of earlier turns" in compacted[1]["content"]
+
+
+def test_function_results_stay_with_their_call():
+    messages = chat()[:-1]
+    for keep in range(1, 6):
+        compacted = ContextCompactor(budget=1500, keep_recent=keep).compact(messages)
+        for i, message in enumerate(compacted):
+            if message["role"] == "function":
+                assert compacted[i - 1].get("function_call"), f"orphaned result with keep_recent={keep}"
+
+
+def test_references_recall_the_full_text():
+    compactor = ContextCompactor(budget=1500, keep_recent=2)
+    messages = chat()
+    summary = compactor.compact(messages)[1]["content"]
+    ref = re.search(r"\[(ctx-\w+)\]", summary).group(1)
+    assert compactor.recall(ref) == messages[1]["content"]
+
+
+class Agent(SimpleNamespace):
+    def update_function_signature(self, func_sig, is_remove):
+        self.llm_config = {**self.llm_config, "functions": self.llm_config.get("functions", []) + [func_sig]}
+
+    def register_function(self, function_map):
+        self.function_map.update(function_map)
+
+    def can_execute_function(self, name):
+        return name in self.function_map
+
+
+def agent(llm_config):
+    return Agent(name="Agency_Director", llm_config=llm_config, function_map={},
+                 generate_reply=None, a_generate_reply=None)
+
+
+def test_attach_gives_llm_agents_recall():
+    compactor = ContextCompactor()
+    director = compactor.attach(agent({"config_list": []}))
+    assert director.llm_config["functions"] == [RECALL_FUNCTION]
+    assert director.function_map["recall"] == compactor.recall
+    proxy = compactor.attach(agent(False))
+    assert proxy.function_map == {}
@@ -0,0 +1,50 @@
+from extract import extract, extract_text
+
+PARAGRAPH = "A paragraph long enough to count as real page content here."
+
+
+def test_keeps_paragraphs_and_drops_boilerplate():
+    html = (f"<html><body><nav><a href='/'>Home</a></nav><p>{PARAGRAPH}</p>"
+            f"<script>var x = 1;</script><footer>Copyright</footer></body></html>")
+    assert extract(html) == PARAGRAPH
+
+
+def test_prefers_main_content():
+    html = f"<div><p>{PARAGRAPH} outside</p></div><article><p>{PARAGRAPH}</p></article>"
+    assert extract(html) == PARAGRAPH
+
+
+def test_drops_short_and_link_heavy_blocks():
+    html = f"<p>Too short</p><p><a href='#'>{PARAGRAPH}</a></p><p>{PARAGRAPH}</p>"
+    assert extract(html) == PARAGRAPH
+
+
+def test_skipped_paragraph_without_end_tag():
+    assert extract(f"<p class='share'>share this<p>{PARAGRAPH}</p>") == PARAGRAPH
+
+
+def test_skipped_list_item_without_end_tag():
+    html = f"<ul><li class='social'>x<li>{PARAGRAPH}</ul><p>{PARAGRAPH} Again.</p>"
+    assert extract(html) == f"{PARAGRAPH}\n\n{PARAGRAPH} Again."
+
+
+def test_skipped_list_item_closed_by_parent():
+    html = f"<ul><li class='social'>x</ul><p>{PARAGRAPH}</p>"
+    assert extract(html) == PARAGRAPH
+
+
+def test_nested_skipped_subtree():
+    html = (f"<div class='sidebar'><div><p>{PARAGRAPH} inner</div><ul><li>a<li>b</ul></div>"
+            f"<p>{PARAGRAPH}</p>")
+    assert extract(html) == PARAGRAPH
+
+
+def test_stray_end_tag_inside_skipped_div_keeps_skipping():
+    html = f"<div class='promo'></span><p>{PARAGRAPH} promo</p></div><p>{PARAGRAPH}</p>"
+    assert extract(html) == PARAGRAPH
+
+
+def test_streams_chunks_and_stops_at_max_bytes():
+    html = f"<p>{PARAGRAPH}</p>".encode()
+    chunks = [html[:10], html[10:], f"<p>{PARAGRAPH} tail</p>".encode()]
+    assert extract_text(chunks, max_bytes=len(html)) == PARAGRAPH
@@ -0,0 +1,118 @@
+import time
+import asyncio
+
+import pytest
+import requests
+
+import http_client
+from http_client import CircuitBreaker, CircuitOpenError
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append(timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(*outcomes, backoff=0.0):
+        session = FakeSession(*outcomes)
+        monkeypatch.setattr(http_client, "session", lambda: session)
+        monkeypatch.setattr(http_client, "_backoff", lambda attempt: backoff)
+        monkeypatch.setattr(http_client, "_breakers", {})
+        return session
+    return install
+
+
+def test_retryable_responses_are_closed_before_retrying(fake):
+    first, second, last = FakeResponse(503), FakeResponse(502), FakeResponse(200)
+    session = fake(first, second, last)
+    assert http_client.request("GET", "http://example.test/", retries=3) is last
+    assert first.closed and second.closed and not last.closed
+    assert len(session.calls) == 3
+
+
+def test_last_attempt_returns_the_failed_response(fake):
+    responses = [FakeResponse(503) for _ in range(2)]
+    fake(*responses)
+    assert http_client.request("GET", "http://example.test/", retries=1) is responses[-1]
+    assert responses[0].closed and not responses[-1].closed
+
+
+def test_connection_errors_are_retried_then_raised(fake):
+    session = fake(requests.ConnectionError("reset"), requests.ConnectionError("reset"))
+    with pytest.raises(requests.ConnectionError):
+        http_client.request("GET", "http://example.test/", retries=1)
+    assert len(session.calls) == 2
+
+
+def test_deadline_caps_timeouts_and_stops_retries(fake):
+    session = fake(FakeResponse(503), FakeResponse(200), backoff=5.0)
+    start = time.monotonic()
+    response = http_client.request("GET", "http://example.test/", retries=3, timeout=(5, 120), deadline=2)
+    assert response.status_code == 503
+    assert time.monotonic() - start < 1
+    assert len(session.calls) == 1
+    connect, read = session.calls[0]
+    assert connect <= 2 and read <= 2
+
+
+def test_breaker_opens_and_admits_a_single_probe():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    # concurrent callers wait for the probe
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_open_breaker_refuses_without_a_request(fake):
+    session = fake()
+    http_client._breaker("example.test").opened_at = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        http_client.request("GET", "http://example.test/")
+    assert session.calls == []
+
+
+def test_a_close_forgets_the_loop():
+    async def run():
+        http_client._async_session()
+        http_client._async_host_limit("example.test")
+        await http_client.a_close()
+
+    asyncio.run(run())
+    assert not http_client._async_sessions
+    assert not http_client._async_limits
@@ -0,0 +1,50 @@
+import time
+
+from knowledge import KnowledgeIndex, chunk_text
+
+OLD = "Oat milk sales grew in coffee shops across Europe last year."
+NEW = "Almond milk prices fell sharply after a record harvest in California."
+
+
+def test_chunk_text_packs_paragraphs():
+    text = "\n\n".join(["word " * 50] * 4)
+    chunks = chunk_text(text, size=600)
+    assert len(chunks) == 2
+    assert all(len(chunk) <= 600 for chunk in chunks)
+    assert chunk_text("x" * 25, size=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_same_text_is_indexed_once():
+    index = KnowledgeIndex(directory="")
+    assert index.add("https://example.com/milk", OLD) == 1
+    assert index.add("https://example.com/milk?utm_source=x", OLD) == 0
+    assert len(index) == 1
+
+
+def test_changed_text_replaces_chunks():
+    index = KnowledgeIndex(directory="")
+    index.add("https://example.com/milk", OLD)
+    index.add("https://example.com/milk", NEW)
+    assert len(index) == 1
+    assert [chunk["text"] for chunk in index.chunks] == [NEW]
+    assert index.search("almond harvest prices")[0]["text"] == NEW
+
+
+def test_parallel_saves_merge(tmp_path):
+    first = KnowledgeIndex(directory=str(tmp_path))
+    second = KnowledgeIndex(directory=str(tmp_path))
+    first.add("https://example.com/oat", OLD)
+    second.add("https://example.com/almond", NEW)
+    first.save()
+    second.save()
+    merged = KnowledgeIndex(directory=str(tmp_path))
+    assert sorted(chunk["text"] for chunk in merged.chunks) == sorted([OLD, NEW])
+
+
+def test_expired_pages_are_dropped(tmp_path):
+    index = KnowledgeIndex(directory=str(tmp_path))
+    index.add("https://example.com/oat", OLD)
+    index.chunks[0]["indexed_at"] = time.time() - 120
+    index.save()
+    assert len(KnowledgeIndex(directory=str(tmp_path), ttl=60)) == 0
+    assert len(KnowledgeIndex(directory=str(tmp_path), ttl=3600)) == 1
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from pipeline import Stage, a_run_pipeline, depth, run_pipeline, transcript, validate
+
+STAGES = [
+    Stage("plan", "Manager", "Plan the launch."),
+    Stage("research", "Researcher", "Research the market.", after=("plan",)),
+    Stage("copy", "Copywriter", "Write the copy.", after=("research",)),
+    Stage("media", "Planner", "Plan the media.", after=("research",)),
+    Stage("review", "Director", "Review everything.", after=("copy", "media")),
+]
+
+
+class Agent:
+    """Answers every stage with its name; `barrier` makes it wait for another agent to be running too."""
+
+    def __init__(self, name, barrier=None):
+        self.name = name
+        self.barrier = barrier
+        self.prompts = []
+
+    def _reply(self, messages):
+        self.prompts.append(messages[0]["content"])
+        return f"{self.name} deliverable. " + "Details. " * 30 + "TERMINATE"
+
+    def generate_reply(self, messages):
+        if self.barrier is not None:
+            self.barrier.wait()
+        return self._reply(messages)
+
+    async def a_generate_reply(self, messages):
+        if self.barrier is not None:
+            await self.barrier.wait()
+        return self._reply(messages)
+
+
+def agents(barrier=None):
+    names = ("Manager", "Researcher", "Copywriter", "Planner", "Director")
+    return [Agent(name, barrier if name in ("Copywriter", "Planner") else None) for name in names]
+
+
+def test_validate_rejects_bad_graphs():
+    with pytest.raises(ValueError, match="duplicate"):
+        validate([Stage("a", "A", "x"), Stage("a", "B", "y")])
+    with pytest.raises(ValueError, match="unknown stage"):
+        validate([Stage("a", "A", "x", after=("missing",))])
+    with pytest.raises(ValueError, match="cycle"):
+        validate([Stage("a", "A", "x", after=("b",)), Stage("b", "B", "y", after=("a",))])
+    assert set(validate(STAGES)) == {"plan", "research", "copy", "media", "review"}
+
+
+def test_depth_is_the_critical_path():
+    assert depth(STAGES) == 4
+    assert depth([Stage("a", "A", "x"), Stage("b", "B", "y")]) == 1
+    assert depth([]) == 0
+
+
+def check(results, team):
+    assert set(results) == {"plan", "research", "copy", "media", "review"}
+    assert results["review"].output.startswith("Director deliverable.")
+    assert all(r.rounds == 1 for r in results.values())
+    # every stage starts after its dependencies finish and sees all their outputs
+    for stage in STAGES:
+        for dep in stage.after:
+            assert results[dep].finished <= results[stage.name].started
+    director = next(agent for agent in team if agent.name == "Director")
+    assert all(f"## {name} (" in director.prompts[0] for name in ("plan", "research", "copy", "media"))
+    messages = transcript("Brief", results)
+    assert messages[0]["content"] == "Brief" and len(messages) == 6
+
+
+def test_run_pipeline_runs_independent_stages_concurrently():
+    # copy and media only get past the barrier when they run at the same time
+    team = agents(threading.Barrier(2, timeout=5))
+    check(run_pipeline(STAGES, team, "Brief"), team)
+
+
+def test_a_run_pipeline_runs_independent_stages_concurrently():
+    async def run():
+        team = agents(asyncio.Barrier(2))
+        results = await asyncio.wait_for(a_run_pipeline(STAGES, team, "Brief"), timeout=5)
+        return team, results
+
+    team, results = asyncio.run(run())
+    check(results, team)
+
+
+def test_function_calls_take_another_turn():
+    class Caller(Agent):
+        def generate_reply(self, messages):
+            if len(messages) == 1:
+                return {"content": None, "function_call": {"name": "research", "arguments": "{}"}}
+            if messages[-1]["role"] == "assistant":
+                return {"role": "function", "name": "research", "content": "Findings."}
+            return self._reply(messages)
+
+    results = run_pipeline([Stage("research", "Researcher", "Research.")], [Caller("Researcher")], "Brief")
+    assert results["research"].rounds == 2
+    assert results["research"].output.startswith("Researcher deliverable.")
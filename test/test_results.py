@@ -0,0 +1,20 @@
+from results import Draft, ResearchResult, preview
+
+
+def test_preview_cuts_at_a_line_break():
+    text = "first line\n" + "x" * 50
+    assert preview(text, "draft-1", 100) == text
+    assert preview(text, "draft-1", 20) == "first line\n[51 more characters: read_artifact('draft-1', start=10)]"
+
+
+def test_draft_shows_a_preview_and_its_handle():
+    draft = Draft("boots", "word " * 400, "draft-abc")
+    shown = str(draft)
+    assert len(shown) < len(draft.text)
+    assert shown.endswith("artifact_id: draft-abc (read_artifact for the full draft)")
+    assert "read_artifact('draft-abc', start=" in shown
+
+
+def test_research_without_artifact_is_shown_whole():
+    result = ResearchResult(query="boots", findings="word " * 2000)
+    assert str(result) == result.findings
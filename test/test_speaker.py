@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from speaker import LocalSelector, executor
+
+
+def agent(name, description, functions=()):
+    return SimpleNamespace(name=name, description=description, can_execute_function=lambda f: f in functions)
+
+
+MANAGER = agent("Agency_Manager", "Outlines plan for agents.")
+RESEARCHER = agent("Agency_Researcher", "Conducts detailed research on market trends.")
+MARKETER = agent("Agency_Marketer", "Crafts marketing campaigns for the audience.")
+AGENTS = [MANAGER, RESEARCHER, MARKETER]
+TRANSITIONS = {"Agency_Manager": ["Agency_Researcher", "Agency_Marketer"]}
+
+
+def test_candidates_follow_transitions():
+    selector = LocalSelector(AGENTS, TRANSITIONS)
+    assert selector.candidates(MANAGER, AGENTS) == [RESEARCHER, MARKETER]
+    assert selector.candidates(MARKETER, AGENTS) == AGENTS
+
+
+def test_required_role_speaks_first():
+    selector = LocalSelector(AGENTS, TRANSITIONS, required=["Agency_Researcher"])
+    messages = [{"name": "Agency_Manager", "content": "Plan a marketing campaign for the audience."}]
+    assert selector.select(MANAGER, messages, AGENTS) is RESEARCHER
+    messages.append({"name": "Agency_Researcher", "content": "Findings."})
+    messages.append({"name": "Agency_Manager", "content": "Now the marketing campaign for the audience."})
+    assert selector.select(MANAGER, messages, AGENTS) is MARKETER
+
+
+def test_role_mention_wins():
+    selector = LocalSelector(AGENTS, TRANSITIONS)
+    messages = [{"name": "Agency_Manager", "content": "Over to the researcher for the next step."}]
+    assert selector.select(MANAGER, messages, AGENTS) is RESEARCHER
+
+
+def test_close_scores_fall_back_to_llm():
+    selector = LocalSelector(AGENTS, TRANSITIONS, min_margin=10)
+    assert selector.select(MANAGER, [{"name": "Agency_Manager", "content": "ok"}], AGENTS) is None
+    assert selector.stats()["fallbacks"] == 1
+
+
+def test_function_calls_stay_with_the_caller():
+    researcher = agent("Agency_Researcher", "Conducts research.", functions=("research",))
+    assistant = agent("writing_assistant", "Researches and writes content.", functions=("research",))
+    strategist = agent("Agency_Strategist", "Develops strategic briefs.")
+    agents = [MANAGER, researcher, assistant, strategist]
+    transitions = {"Agency_Researcher": ["Agency_Strategist"], "writing_assistant": ["Agency_Manager"]}
+    selector = LocalSelector(agents, transitions)
+    messages = [{"name": "Agency_Manager", "content": "Research the market."},
+                {"name": "Agency_Researcher", "content": None, "function_call": {"name": "research"}}]
+    assert executor(researcher, messages, agents) is researcher
+    assert executor(MANAGER, messages, agents) is None
+    assert executor(MANAGER, messages, [MANAGER, researcher, strategist]) is researcher
+    # even if another agent ran the call, the caller's transitions decide who follows the result
+    messages.append({"role": "function", "name": "research", "content": "Findings."})
+    assert selector.candidates(assistant, agents) == [MANAGER]
+    assert selector.select(assistant, messages, agents) is strategist
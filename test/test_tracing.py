@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+def test_counts_from_threads_reach_the_parent(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_DIR", "unused")
+    monkeypatch.setattr(tracing, "_spans", [])
+
+    def child(i):
+        with tracing.span(f"child-{i}", "tool") as attrs:
+            for _ in range(2000):
+                tracing.count(prompt_tokens=1)
+        return attrs
+
+    with tracing.span("parent", "agent") as parent:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(tracing.bind(child), i) for i in range(8)]
+            children = [future.result() for future in futures]
+
+    assert parent["prompt_tokens"] == 8 * 2000
+    assert all(attrs["prompt_tokens"] == 2000 for attrs in children)
+    assert {span["name"] for span in tracing._spans} == {"parent"} | {f"child-{i}" for i in range(8)}
@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+
+from transcript import TranscriptWriter, _part_path, read_round
+
+
+def message(n):
+    return {"name": f"Agent{n % 3}", "content": f"Message {n}. " + "x" * 60}
+
+
+def write(tmp_path, count, **kwargs):
+    writer = TranscriptWriter("run", str(tmp_path), max_bytes=300, batch=4, flush_seconds=0.01, **kwargs)
+    for n in range(count):
+        writer.write(message(n))
+    return writer
+
+
+def test_parts_rotate_and_rolled_parts_are_gzipped(tmp_path):
+    writer = write(tmp_path, 20)
+    writer.flush()
+    assert writer.parts > 2
+    last = writer.parts - 1
+    for part in range(last):
+        assert not os.path.exists(_part_path(writer.base, part))
+        with gzip.open(_part_path(writer.base, part) + ".gz") as file:
+            assert 0 < len(file.read()) <= 300
+    assert os.path.exists(_part_path(writer.base, last))
+    writer.close()
+    # the part still being written is compressed on close
+    assert not os.path.exists(_part_path(writer.base, last))
+    assert os.path.exists(_part_path(writer.base, last) + ".gz")
+    assert "20 messages" in writer.report()
+
+
+def test_index_covers_every_round(tmp_path):
+    writer = write(tmp_path, 20)
+    writer.close()
+    with open(f"{writer.base}.index.jsonl") as file:
+        entries = [json.loads(line) for line in file]
+    assert [e["round"] for e in entries] == list(range(1, 21))
+    assert entries[0]["part"] == 0 and entries[0]["offset"] == 0
+    assert entries[-1]["part"] == writer.parts - 1
+    assert sum(e["length"] for e in entries) == writer.bytes
+
+
+def test_read_round_from_plain_and_gzipped_parts(tmp_path):
+    writer = write(tmp_path, 20)
+    # round 1 is in a rolled gzip part, round 20 in the open plain part
+    assert writer.read(1) == f"### 1. Agent0\n\n{message(0)['content']}\n\n"
+    assert writer.read(20) == f"### 20. Agent1\n\n{message(19)['content']}\n\n"
+    writer.close()
+    assert read_round(writer.base, 20) == f"### 20. Agent1\n\n{message(19)['content']}\n\n"
+    assert read_round(writer.base, 21) is None
+
+
+def test_uncompressed_transcripts_keep_plain_parts(tmp_path):
+    writer = write(tmp_path, 20, compress="none")
+    writer.close()
+    assert all(os.path.exists(_part_path(writer.base, part)) for part in range(writer.parts))
+    assert read_round(writer.base, 7).startswith("### 7. Agent0")
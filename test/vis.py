@@ -1,7 +1,7 @@
 from autogen import AssistantAgent, UserProxyAgent, config_list_from_json
 import autogen
 import replicate
-import requests
+import sys
 from datetime import datetime
 import http.client
 import json
@@ -9,6 +9,10 @@ import base64
 from dotenv import load_dotenv
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import http_client
+from cassette import cassette
+
 load_dotenv()
 config_list = config_list_from_json(env_or_file="OAI_CONFIG_LIST")
 llm_config = {"config_list": config_list, "request_timeout": 120}
@@ -17,13 +21,15 @@ user_prompt = input("Describe an image and art direction: ")
 
 # function to use llava model to review image
 def img_review(image_path, prompt):
-    output = replicate.run(
-        "yorickvp/llava-13b:2facb4a474a0462c15041b78b1ad70952ea46b5ec6ad29583c0b29dbd4249591",
+    model = "yorickvp/llava-13b:2facb4a474a0462c15041b78b1ad70952ea46b5ec6ad29583c0b29dbd4249591"
+    review_prompt = f"What is happening in the image? From scale 1 to 10, decide how similar the image is to the text prompt {prompt}?"
+    output = cassette.call("replicate", {"model": model, "image": image_path, "prompt": review_prompt}, lambda: list(replicate.run(
+        model,
         input={
             "image": open(image_path, "rb"),
-            "prompt": f"What is happening in the image? From scale 1 to 10, decide how similar the image is to the text prompt {prompt}?",
+            "prompt": review_prompt,
         }
-    )
+    )))
 
     result = ""
     for item in output:
@@ -33,12 +39,13 @@ def img_review(image_path, prompt):
 
 # function to use stability-ai model to generate image
 def text_to_image_generation(prompt):
-    output = replicate.run(
-        "stability-ai/sdxl:c221b2b8ef527988fb59bf24a8b97c4561f1c671f73bd389f866bfb27c061316",
+    model = "stability-ai/sdxl:c221b2b8ef527988fb59bf24a8b97c4561f1c671f73bd389f866bfb27c061316"
+    output = cassette.call("replicate", {"model": model, "prompt": prompt}, lambda: list(replicate.run(
+        model,
         input={
             "prompt": prompt
         }
-    )
+    )))
 
     if output and len(output) > 0:
         # Get the image URL from the output
@@ -50,7 +57,7 @@ def text_to_image_generation(prompt):
         shortened_prompt = prompt[:50]
         filename = f"imgs/{shortened_prompt}_{current_time}.png"
 
-        response = requests.get(image_url)
+        response = http_client.get(image_url)
         if response.status_code == 200:
             with open(filename, "wb") as file:
                 file.write(response.content)
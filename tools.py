@@ -1,24 +1,60 @@
 import os
+import time
+import asyncio
 import requests
-from bs4 import BeautifulSoup
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 import autogen
 import openai
 from autogen import config_list_from_json, UserProxyAgent, AssistantAgent, GroupChat, GroupChatManager
-from langchain.chat_models import ChatOpenAI
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains.summarize import load_summarize_chain
-from langchain.prompts import PromptTemplate 
 from dotenv import load_dotenv
+import http_client
+from extract import extract_text, EXTRACT_MAX_BYTES
+from summarize import get_summarizer
+from agent_pool import AgentPool
+from results import extract_result, ResearchResult, Source, Draft
+from artifacts import artifacts, ARTIFACT_READ_CHARS
+from knowledge import knowledge, format_hits
+import llm_cache
+import tracing
+from tracing import traced
+from cache import (search_cache, page_cache, scrape_flight, a_scrape_flight, scrape_session,
+                   normalize_query, content_key, canonical_url, page_is_fresh)
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 BROWSERLESS_API_KEY = os.getenv("BROWSERLESS_API_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+BROWSERLESS_URL = os.getenv("BROWSERLESS_URL", "https://chrome.browserless.io/content")
 config_list = config_list_from_json("OAI_CONFIG_LIST")
+# batch runs set this to NEVER so no proxy waits on stdin
+HUMAN_INPUT_MODE = os.getenv("HUMAN_INPUT_MODE", "TERMINATE")
+# agents disable autogen's own cache_seed cache; completions go through llm_cache instead
+llm_cache.install()
+tracing.install()
+# "chat" runs the researcher agent loop; "fanout" plans queries up front and fetches concurrently
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "chat")
+RESEARCH_WORKERS = int(os.getenv("RESEARCH_WORKERS", 8))
+RESEARCH_QUERIES = int(os.getenv("RESEARCH_QUERIES", 4))
+RESEARCH_TOP_K = int(os.getenv("RESEARCH_TOP_K", 2))
+# write_contents: pieces written at once, and research longer than this is digested once for all of them
+WRITE_WORKERS = int(os.getenv("WRITE_WORKERS", 4))
+WRITE_DIGEST_CHARS = int(os.getenv("WRITE_DIGEST_CHARS", 8000))
+# HEADs for a page's ETag/Last-Modified run here while Browserless renders the page
+_validator_pool = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix="validators")
 
+@traced("search")
 def search(query):
-    url = "https://google.serper.dev/search"
+    # repeated queries for the same brand are served from the on-disk cache
+    key = content_key("serper", {"q": normalize_query(query)})
+    cached = search_cache.get(key)
+    tracing.annotate(cache="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
+    url = SERPER_URL
 
     payload = json.dumps({
         "q": query
@@ -28,14 +64,86 @@ def search(query):
         'Content-Type': 'application/json'
     }
 
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = http_client.request("POST", url, headers=headers, data=payload)
+
+    result = response.json()
+    if response.status_code == 200:
+        search_cache.set(key, result)
+    return result
+
+@traced("search")
+async def a_search(query):
+    """Async counterpart of search(), sharing its cache."""
+    key = content_key("serper", {"q": normalize_query(query)})
+    cached = search_cache.get(key)
+    tracing.annotate(cache="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
+    headers = {
+        'X-API-KEY': SERPER_API_KEY,
+        'Content-Type': 'application/json'
+    }
+    response = await http_client.a_request("POST", SERPER_URL, headers=headers, data=json.dumps({"q": query}))
 
-    return response.json()
+    result = response.json()
+    if response.status_code == 200:
+        search_cache.set(key, result)
+    return result
 
+@traced("scrape")
 def scrape(url: str):
     """Scrape a website and summarize its content if it's too large."""
+    key = canonical_url(url)
+    # the same page under another URL spelling earlier in this session
+    seen, result = scrape_session().get(key)
+    if seen:
+        tracing.annotate(cache="session")
+        return result
+    # concurrent requests for the same page share a single fetch
+    result = scrape_flight.do(key, lambda: _scrape_cached(key, url))
+    if result is not None:
+        scrape_session().set(key, result)
+    return result
+
+@traced("scrape")
+async def a_scrape(url: str):
+    """Async counterpart of scrape(), sharing its session, caches and index."""
+    key = canonical_url(url)
+    seen, result = scrape_session().get(key)
+    if seen:
+        tracing.annotate(cache="session")
+        return result
+    result = await a_scrape_flight.do(key, lambda: _a_scrape_cached(key, url))
+    if result is not None:
+        scrape_session().set(key, result)
+    return result
+
+def _serve_cached(url, entry, status):
+    tracing.annotate(cache=status)
+    knowledge.add(url, entry["text"])
+    return entry["summary"] or entry["text"]
+
+def _store_page(key, url, text, output, validators):
+    page_cache.set(key, {
+        "url": url,
+        "text": text,
+        "summary": output,
+        "fetched_at": time.time(),
+        **validators,
+    })
+    knowledge.add(url, text)
+
+def _scrape_cached(key, url):
+    entry = page_cache.get(key)
+    if entry is not None and page_is_fresh(entry):
+        return _serve_cached(url, entry, "hit")
+    if entry is not None and _revalidate(key, entry):
+        return _serve_cached(url, entry, "revalidated")
+    tracing.annotate(cache="miss")
+
     print("Scraping website...")
-    
+
     # Define the headers for the request
     headers = {
         'Cache-Control': 'no-cache',
@@ -43,51 +151,152 @@ def scrape(url: str):
     }
     
     # Build the POST URL
-    post_url = f"https://chrome.browserless.io/content?token={BROWSERLESS_API_KEY}"
-    
+    post_url = f"{BROWSERLESS_URL}?token={BROWSERLESS_API_KEY}"
+
+    # the origin's validators are fetched alongside the render, not after it
+    validators = _validator_pool.submit(tracing.bind(_validators), url)
+
     # Send the POST request
-    response = requests.post(post_url, headers=headers, json={"url": url})
+    response = http_client.post(post_url, headers=headers, json={"url": url}, timeout=(5, 120), stream=True)
 
     # Check the response status code
     if response.status_code == 200:
-        soup = BeautifulSoup(response.content, "html.parser")
-        text = soup.get_text()
+        # parse while downloading; boilerplate is dropped and bytes past the cap are never read
+        try:
+            text = extract_text(response.iter_content(chunk_size=64 * 1024))
+        finally:
+            response.close()
         print("CONTENTTTTTT:", text)
-        
-        if len(text) > 8000:
-            output = summary(text)
-            return output
-        else:
-            return text
+
+        output = summary(text) if get_summarizer().needs_summary(text) else None
+        _store_page(key, url, text, output, validators.result())
+        return output or text
     else:
+        response.close()
         print(f"HTTP request failed with status code {response.status_code}")
 
-def summary(content):
-    llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo-1106")
-    text_splitter = RecursiveCharacterTextSplitter(
-        separators=["\n\n", "\n"], chunk_size=10000, chunk_overlap=500)
-    docs = text_splitter.create_documents([content])
-    map_prompt = """
-    Write a detailed summary of the following text for a research purpose:
-    "{text}"
-    SUMMARY:
-    """
-    map_prompt_template = PromptTemplate(
-        template=map_prompt, input_variables=["text"])
-
-    summary_chain = load_summarize_chain(
-        llm=llm,
-        chain_type='map_reduce',
-        map_prompt=map_prompt_template,
-        combine_prompt=map_prompt_template,
-        verbose=True
+async def _a_scrape_cached(key, url):
+    entry = page_cache.get(key)
+    if entry is not None and page_is_fresh(entry):
+        return await asyncio.to_thread(_serve_cached, url, entry, "hit")
+    if entry is not None and await _a_revalidate(key, entry):
+        return await asyncio.to_thread(_serve_cached, url, entry, "revalidated")
+    tracing.annotate(cache="miss")
+
+    print("Scraping website...")
+    headers = {
+        'Cache-Control': 'no-cache',
+        'Content-Type': 'application/json',
+    }
+    post_url = f"{BROWSERLESS_URL}?token={BROWSERLESS_API_KEY}"
+    # the origin's validators are fetched alongside the render, not after it
+    validators = asyncio.ensure_future(_a_validators(url))
+    try:
+        # streamed and cut off at the extractor's cap, so a huge page never sits in memory whole
+        response = await http_client.a_post(post_url, headers=headers, json={"url": url}, timeout=(5, 120),
+                                            max_bytes=EXTRACT_MAX_BYTES)
+
+        if response.status_code == 200:
+            # parsing and vectorizing are CPU work; keep them off the event loop
+            text = await asyncio.to_thread(extract_text, response.iter_content(chunk_size=64 * 1024))
+            print("CONTENTTTTTT:", text)
+
+            output = await a_summary(text) if get_summarizer().needs_summary(text) else None
+            await asyncio.to_thread(_store_page, key, url, text, output, await validators)
+            return output or text
+        else:
+            print(f"HTTP request failed with status code {response.status_code}")
+    finally:
+        validators.cancel()
+
+def _validator_fields(response):
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+def _validators(url):
+    """Fetch the origin's ETag/Last-Modified so later scrapes can revalidate cheaply."""
+    try:
+        response = http_client.head(url, allow_redirects=True, retries=0, timeout=10)
+    except requests.RequestException:
+        return {}
+    return _validator_fields(response)
+
+async def _a_validators(url):
+    try:
+        response = await http_client.a_head(url, allow_redirects=True, retries=0, timeout=10)
+    except requests.RequestException:
+        return {}
+    return _validator_fields(response)
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _touch(key, entry):
+    """Count a cached page as fetched now, so it is served without revalidating for another max age."""
+    entry["fetched_at"] = time.time()
+    page_cache.set(key, entry)
+
+def _still_current(key, entry, response):
+    current = response.status_code == 304 or (
+        response.status_code == 200
+        and entry.get("etag") is not None
+        and response.headers.get("ETag") == entry["etag"]
     )
+    if current:
+        _touch(key, entry)
+    return current
+
+def _revalidate(key, entry):
+    """Conditionally re-check a cached page against its origin; True if still current."""
+    headers = _conditional_headers(entry)
+    if not headers:
+        return False
+    try:
+        response = http_client.head(entry["url"], headers=headers, allow_redirects=True, retries=0, timeout=10)
+    except requests.RequestException:
+        # origin unreachable; a stale copy beats no copy, and the next check waits a max age
+        _touch(key, entry)
+        return True
+    return _still_current(key, entry, response)
 
-    output = summary_chain.run(input_documents=docs,)
+async def _a_revalidate(key, entry):
+    headers = _conditional_headers(entry)
+    if not headers:
+        return False
+    try:
+        response = await http_client.a_head(entry["url"], headers=headers, allow_redirects=True, retries=0, timeout=10)
+    except requests.RequestException:
+        _touch(key, entry)
+        return True
+    return _still_current(key, entry, response)
 
+@traced("summary")
+def summary(content):
+    output, timings = get_summarizer().summarize(content)
+    _report_summary(content, timings)
     return output
 
-def research(query):
+@traced("summary")
+async def a_summary(content):
+    output, timings = await get_summarizer().a_summarize(content)
+    _report_summary(content, timings)
+    return output
+
+def _report_summary(content, timings):
+    calls = [t for t in timings if not t["cached"]]
+    tracing.annotate(llm_calls=len(calls), cached_chunks=len(timings) - len(calls))
+    print(f"Summarized {len(content)} chars in {len(calls)} LLM calls "
+          f"({len(timings) - len(calls)} reused): " + ", ".join(
+              f"{t['stage']}#{t['index']} {t['seconds']:.1f}s" for t in calls))
+
+def _build_research_team(asynchronous=False):
     llm_config_researcher = {
         "functions": [
             {
@@ -119,7 +328,8 @@ def research(query):
                 },
             },
         ],
-        "config_list": config_list}
+        "config_list": config_list,
+        "cache_seed": None}
 
     researcher = autogen.AssistantAgent(
         name="researcher",
@@ -131,25 +341,231 @@ def research(query):
         name="User_proxy",
         code_execution_config={"last_n_messages": 2, "work_dir": "coding"},
         is_termination_msg=lambda msg: "TERMINATE" in msg["content"] if msg["content"] else False,
-        human_input_mode="TERMINATE",
+        human_input_mode=HUMAN_INPUT_MODE,
         function_map={
-            "search": search,
-            "scrape": scrape,
+            "search": a_search if asynchronous else search,
+            "scrape": a_scrape if asynchronous else scrape,
         }
     )
 
-    user_proxy.initiate_chat(researcher, message=query)
+    tracing.instrument_agent(researcher)
+    tracing.instrument_agent(user_proxy)
+    return {"researcher": researcher, "user_proxy": user_proxy}
 
-    # set the receiver to be researcher, and get a summary of the research report
-    user_proxy.stop_reply_at_receive(researcher)
-    user_proxy.send(
-        "Give me the research report that just generated again, return ONLY the report & reference links", researcher)
+research_pool = AgentPool("research", _build_research_team)
+# same team, with the async search and scrape tools
+a_research_pool = AgentPool("a_research", lambda: _build_research_team(asynchronous=True))
 
-    # return the last message the expert received
-    return user_proxy.last_message()["content"]
+def _research_brief(query):
+    """The researcher's opening message, with knowledge-index hits, and those hits."""
+    # pages fetched by earlier research calls may already answer part of the query
+    hits = knowledge.search(query)
+    tracing.annotate(knowledge_hits=len(hits))
+    message = query
+    if hits:
+        message += ("\n\nMaterial already collected from earlier research (search and scrape only "
+                    "for what it does not cover):\n\n" + format_hits(hits))
+    return message, hits
 
+@traced("research")
+def research(query):
+    if RESEARCH_MODE == "fanout":
+        return research_fanout(query)
 
-def write_content(research_material, topic):
+    message, hits = _research_brief(query)
+    with research_pool.checkout() as team:
+        researcher, user_proxy = team["researcher"], team["user_proxy"]
+        user_proxy.initiate_chat(researcher, message=message)
+
+        # the report is the researcher's final message; only ask for it again if there is none
+        sent = [m for m in researcher.chat_messages[user_proxy] if m["role"] == "assistant"]
+        report = extract_result(sent)
+        tracing.annotate(result="extracted" if report else "regenerated")
+        if not report:
+            # set the receiver to be researcher, and get a summary of the research report
+            user_proxy.stop_reply_at_receive(researcher)
+            user_proxy.send(
+                "Give me the research report that just generated again, return ONLY the report & reference links", researcher)
+
+            # the last message the expert received
+            report = user_proxy.last_message()["content"]
+
+        scraped, titles = _research_calls(sent)
+        return _research_result(query, report, scraped + [hit["url"] for hit in hits], titles)
+
+@traced("research")
+async def a_research(query):
+    """Async counterpart of research(): the chat and its tool calls run on the event loop."""
+    if RESEARCH_MODE == "fanout":
+        return await a_research_fanout(query)
+
+    message, hits = _research_brief(query)
+    with a_research_pool.checkout() as team:
+        researcher, user_proxy = team["researcher"], team["user_proxy"]
+        await user_proxy.a_initiate_chat(researcher, message=message)
+
+        sent = [m for m in researcher.chat_messages[user_proxy] if m["role"] == "assistant"]
+        report = extract_result(sent)
+        tracing.annotate(result="extracted" if report else "regenerated")
+        if not report:
+            user_proxy.stop_reply_at_receive(researcher)
+            await user_proxy.a_send(
+                "Give me the research report that just generated again, return ONLY the report & reference links", researcher)
+            report = user_proxy.last_message()["content"]
+
+        scraped, titles = _research_calls(sent)
+        return _research_result(query, report, scraped + [hit["url"] for hit in hits], titles)
+
+def _research_calls(messages):
+    """URLs the researcher scraped, and result titles from its (cached) searches."""
+    scraped, titles = [], {}
+    for message in messages:
+        call = message.get("function_call") or {}
+        try:
+            args = json.loads(call.get("arguments") or "{}")
+        except ValueError:
+            continue
+        if call.get("name") == "scrape" and args.get("url"):
+            scraped.append(args["url"])
+        elif call.get("name") == "search" and args.get("query"):
+            result = search_cache.peek(content_key("serper", {"q": normalize_query(args["query"])})) or {}
+            for item in result.get("organic", []):
+                if item.get("link"):
+                    titles.setdefault(canonical_url(item["link"]), item.get("title", ""))
+    return scraped, titles
+
+def collect_sources(findings, scraped=(), titles=None):
+    """Deduplicated sources: scraped pages first, then links cited in the findings, with fetch metadata."""
+    titles = titles or {}
+    cited = [url.rstrip(".,;:") for url in re.findall(r"https?://[^\s<>()\[\]\"'`]+", findings or "")]
+    sources, seen = [], set()
+    for url, was_scraped in [(url, True) for url in scraped] + [(url, False) for url in cited]:
+        key = canonical_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        entry = page_cache.peek(key) or {}
+        text = entry.get("text") or ""
+        sources.append(Source(
+            url=url,
+            title=titles.get(key, ""),
+            scraped=was_scraped,
+            fetched_at=entry.get("fetched_at"),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+            chars=len(text),
+            artifact_id=artifacts.put("page", {"url": url, "title": titles.get(key, ""), "text": text}) if text else None,
+        ))
+    return sources
+
+def _research_result(query, report, scraped=(), titles=None):
+    findings = (report or "").replace("TERMINATE", "").strip()
+    result = ResearchResult(query=query, findings=findings, sources=collect_sources(findings, scraped, titles))
+    result.artifact_id = artifacts.put("research", result.to_dict())
+    return result
+
+def _complete(prompt):
+    client = autogen.OpenAIWrapper(config_list=config_list, cache_seed=None)
+    response = client.create(messages=[{"role": "user", "content": prompt}])
+    return client.extract_text_or_completion_object(response)[0]
+
+async def _a_complete(prompt):
+    # OpenAIWrapper has no async API; like autogen's own a_generate_oai_reply, run it in the default executor
+    return await asyncio.get_running_loop().run_in_executor(None, tracing.bind(_complete), prompt)
+
+def _plan_prompt(query, n):
+    return (f"Plan the web research for: {query}\n"
+            f"Return ONLY a JSON array of up to {n} distinct Google search queries that together cover the topic.")
+
+def _parse_queries(reply, query, n):
+    match = re.search(r"\[.*\]", reply or "", re.S)
+    try:
+        queries = [str(q) for q in json.loads(match.group(0))] if match else []
+    except ValueError:
+        queries = []
+    return queries[:n] or [query]
+
+def plan_queries(query, n=RESEARCH_QUERIES):
+    """One planning call that emits several complementary search queries at once."""
+    return _parse_queries(_complete(_plan_prompt(query, n)), query, n)
+
+async def a_plan_queries(query, n=RESEARCH_QUERIES):
+    return _parse_queries(await _a_complete(_plan_prompt(query, n)), query, n)
+
+def fan_out(fn, items, workers=RESEARCH_WORKERS):
+    """Run fn over items on a bounded thread pool, preserving order; failures map to None."""
+    def call(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            print(f"{fn.__name__}({item!r}) failed: {e}")
+            return None
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = [pool.submit(tracing.bind(call), item) for item in items]
+        return [future.result() for future in futures]
+
+async def a_fan_out(fn, items, workers=RESEARCH_WORKERS):
+    """Await coroutine fn over items, at most `workers` at a time, preserving order; failures map to None."""
+    limit = asyncio.Semaphore(workers)
+
+    async def call(item):
+        async with limit:
+            try:
+                return await fn(item)
+            except Exception as e:
+                print(f"{fn.__name__}({item!r}) failed: {e}")
+                return None
+
+    return await asyncio.gather(*(call(item) for item in items))
+
+def _search_links(queries, results):
+    """Snippet lines, the top links to scrape and link titles from a batch of search results."""
+    snippets, urls, titles = [], [], {}
+    for q, result in zip(queries, results):
+        organic = (result or {}).get("organic", [])
+        for item in organic:
+            snippets.append(f"- [{q}] {item.get('title')}: {item.get('snippet')} ({item.get('link')})")
+            if item.get("link"):
+                titles.setdefault(canonical_url(item["link"]), item.get("title", ""))
+        for item in organic[:RESEARCH_TOP_K]:
+            if item.get("link") and item["link"] not in urls:
+                urls.append(item["link"])
+    return snippets, urls, titles
+
+def _report_prompt(query, snippets, hits, urls, pages):
+    sources = "\n\n".join(
+        [f"SOURCE {hit['url']}\n{hit['text']}" for hit in hits] +
+        [f"SOURCE {url}\n{page}" for url, page in zip(urls, pages) if page])
+    return (
+        f"Research about the following query and generate a detailed research report "
+        f"with loads of technique details and all reference links attached.\n"
+        f"QUERY: {query}\n\nSEARCH RESULTS:\n" + "\n".join(snippets) +
+        f"\n\nSCRAPED PAGES:\n{sources}\n\nReturn ONLY the report & reference links.")
+
+def research_fanout(query):
+    """Plan queries, search and scrape them concurrently, then write one merged report."""
+    hits = knowledge.search(query)
+    queries = plan_queries(query)
+    snippets, urls, titles = _search_links(queries, fan_out(search, queries))
+    pages = fan_out(scrape, urls)
+    report = _complete(_report_prompt(query, snippets, hits, urls, pages))
+    scraped = [url for url, page in zip(urls, pages) if page] + [hit["url"] for hit in hits]
+    return _research_result(query, report, scraped, titles)
+
+async def a_research_fanout(query):
+    hits = knowledge.search(query)
+    queries = await a_plan_queries(query)
+    snippets, urls, titles = _search_links(queries, await a_fan_out(a_search, queries))
+    pages = await a_fan_out(a_scrape, urls)
+    report = await _a_complete(_report_prompt(query, snippets, hits, urls, pages))
+    scraped = [url for url, page in zip(urls, pages) if page] + [hit["url"] for hit in hits]
+    return _research_result(query, report, scraped, titles)
+
+
+def _build_writing_team():
     editor = autogen.AssistantAgent(
         name="editor",
         description="Seasoned editor skilled in structuring blog posts for clarity and coherence, using material from the Research Assistant.",
@@ -159,7 +575,7 @@ def write_content(research_material, topic):
         Your role is to craft the structure of a short blog post using the material from the Research Assistant. Use your experience to ensure clarity, coherence, and precision. 
         Once structured, pass it to the Writer to pen the final piece.
         ''',
-        llm_config={"config_list": config_list},
+        llm_config={"config_list": config_list, "cache_seed": None},
     )
 
     writer = autogen.AssistantAgent(
@@ -172,7 +588,7 @@ def write_content(research_material, topic):
         Approach the topic from a journalistic perspective; aim to inform and engage the readers without adopting a sales-oriented tone. 
         After two rounds of revisions, conclude your post with "TERMINATE".
         ''',
-        llm_config={"config_list": config_list},
+        llm_config={"config_list": config_list, "cache_seed": None},
     )
 
     reviewer = autogen.AssistantAgent(
@@ -183,7 +599,7 @@ def write_content(research_material, topic):
         Your role is to meticulously review and critique the written blog, ensuring it meets the highest standards of clarity, coherence, and precision. 
         Provide invaluable feedback to the Writer to elevate the piece. After two rounds of content iteration, conclude with "TERMINATE".
         ''',        
-        llm_config={"config_list": config_list},
+        llm_config={"config_list": config_list, "cache_seed": None},
     )
 
     user_proxy = UserProxyAgent(
@@ -191,7 +607,7 @@ def write_content(research_material, topic):
         system_message="A human admin. Interact with editor to discuss the structure. Actual writing needs to be approved by this admin.",
         code_execution_config=False,
         is_termination_msg=lambda msg: "TERMINATE" in msg["content"] if msg["content"] else False,
-        human_input_mode="TERMINATE",
+        human_input_mode=HUMAN_INPUT_MODE,
     )
 
     groupchat = autogen.GroupChat(
@@ -199,17 +615,145 @@ def write_content(research_material, topic):
         messages=[],
         max_round=10)
    
-    manager = autogen.GroupChatManager(groupchat=groupchat)
-    user_proxy.initiate_chat(
-        manager, message=f"Write a blog about {topic}, here are the material: {research_material}")
+    tracing.instrument_groupchat(groupchat)
+    manager = autogen.GroupChatManager(groupchat=groupchat, llm_config={"config_list": config_list, "cache_seed": None})
+    tracing.instrument_agent(manager)
+    return {"editor": editor, "writer": writer, "reviewer": reviewer, "user_proxy": user_proxy, "manager": manager,
+            "groupchat": groupchat}
+
+writing_pool = AgentPool("write_content", _build_writing_team)
+
+def _writing_prompt(topic, material, brand_voice=""):
+    prompt = f"Write a blog about {topic}, here are the material: {material}"
+    if brand_voice:
+        prompt += f"\n\nBrand voice: {brand_voice}"
+    return prompt
+
+def _write(message):
+    """Run one editorial chat on a pooled writing team and return the writer's final draft."""
+    with writing_pool.checkout() as team:
+        user_proxy, manager = team["user_proxy"], team["manager"]
+        user_proxy.initiate_chat(manager, message=message)
+
+        # the blog is the writer's final draft; only ask for it again if there is none
+        blog = extract_result([m for m in team["groupchat"].messages if m.get("name") == "writer"])
+        tracing.annotate(result="extracted" if blog else "regenerated")
+        if blog:
+            return blog
+
+        user_proxy.stop_reply_at_receive(manager)
+        user_proxy.send(
+            "Give me the blog that just generated again, return ONLY the blog, and add TERMINATE in the end of the message", manager)
+
+        # return the last message the expert received
+        return user_proxy.last_message()["content"]
+
+async def _a_write(message):
+    with writing_pool.checkout() as team:
+        user_proxy, manager = team["user_proxy"], team["manager"]
+        await user_proxy.a_initiate_chat(manager, message=message)
+
+        blog = extract_result([m for m in team["groupchat"].messages if m.get("name") == "writer"])
+        tracing.annotate(result="extracted" if blog else "regenerated")
+        if blog:
+            return blog
+
+        user_proxy.stop_reply_at_receive(manager)
+        await user_proxy.a_send(
+            "Give me the blog that just generated again, return ONLY the blog, and add TERMINATE in the end of the message", manager)
+        return user_proxy.last_message()["content"]
+
+@traced("write_content")
+def write_content(research_material="", topic="", research_id=None):
+    research_material, error = _writing_material(research_material, research_id)
+    if error:
+        return error
+    return _draft(topic, _write(_writing_prompt(topic, research_material)))
+
+@traced("write_content")
+async def a_write_content(research_material="", topic="", research_id=None):
+    """Async counterpart of write_content(); the writing team has no tools, so it shares the pool."""
+    research_material, error = _writing_material(research_material, research_id)
+    if error:
+        return error
+    return _draft(topic, await _a_write(_writing_prompt(topic, research_material)))
+
+def _draft(topic, blog):
+    """Store the draft and return it as a Draft, so the chat only carries a preview and its handle."""
+    if not blog:
+        return blog
+    return Draft(topic, blog, artifacts.put("draft", {"topic": topic, "text": blog}))
+
+@traced("read_artifact")
+def read_artifact(artifact_id, start=0, length=ARTIFACT_READ_CHARS):
+    """Part of a stored report, page or draft, so agents fetch only what they need."""
+    part = artifacts.read(artifact_id, start, length)
+    if part is None:
+        return f"No artifact stored under {artifact_id!r}."
+    return part
+
+@traced("write_contents")
+def write_contents(topics, research_material="", research_id=None, brand_voice=""):
+    """Write one piece per topic from shared research; returns {topic: Draft}.
+
+    The material is resolved (and digested, when longer than WRITE_DIGEST_CHARS)
+    once for the whole batch, then up to WRITE_WORKERS editorial chats run at
+    once. Failed pieces map to None.
+    """
+    research_material, error = _writing_material(research_material, research_id)
+    if error:
+        return error
+    topics = list(dict.fromkeys(topics))
+    start = time.perf_counter()
+    if len(research_material) > WRITE_DIGEST_CHARS:
+        research_material = summary(research_material)
+    shared = time.perf_counter() - start
+
+    def piece(topic):
+        piece_start = time.perf_counter()
+        with tracing.span("write_piece", "tool", topic=topic):
+            content = _draft(topic, _write(_writing_prompt(topic, research_material, brand_voice)))
+        return content, time.perf_counter() - piece_start
+
+    pieces = fan_out(piece, topics, WRITE_WORKERS)
+    return _report_pieces(topics, pieces, shared, time.perf_counter() - start)
+
+@traced("write_contents")
+async def a_write_contents(topics, research_material="", research_id=None, brand_voice=""):
+    """Async counterpart of write_contents()."""
+    research_material, error = _writing_material(research_material, research_id)
+    if error:
+        return error
+    topics = list(dict.fromkeys(topics))
+    start = time.perf_counter()
+    if len(research_material) > WRITE_DIGEST_CHARS:
+        research_material = await a_summary(research_material)
+    shared = time.perf_counter() - start
+
+    async def piece(topic):
+        piece_start = time.perf_counter()
+        with tracing.span("write_piece", "tool", topic=topic):
+            content = _draft(topic, await _a_write(_writing_prompt(topic, research_material, brand_voice)))
+        return content, time.perf_counter() - piece_start
 
-    user_proxy.stop_reply_at_receive(manager)
-    user_proxy.send(
-        "Give me the blog that just generated again, return ONLY the blog, and add TERMINATE in the end of the message", manager)
+    pieces = await a_fan_out(piece, topics, WRITE_WORKERS)
+    return _report_pieces(topics, pieces, shared, time.perf_counter() - start)
 
-    # return the last message the expert received
-    return user_proxy.last_message()["content"]
+def _report_pieces(topics, pieces, shared, wall):
+    written = [p for p in pieces if p]
+    total = sum(seconds for _, seconds in written)
+    tracing.annotate(pieces=len(written), failed=len(pieces) - len(written))
+    print(f"Wrote {len(written)}/{len(topics)} pieces in {wall:.1f}s ({total:.1f}s of editorial chats, "
+          f"{shared:.1f}s shared prep): " + ", ".join(
+              f"{topic!r} {p[1]:.1f}s" if p else f"{topic!r} failed" for topic, p in zip(topics, pieces)))
+    return {topic: p[0] if p else None for topic, p in zip(topics, pieces)}
 
-def save_markdown(conversation_log):
-    with open("/logs/conversation_log.md", "a") as file:
-        file.write(conversation_log + "\n")
+def _writing_material(research_material, research_id):
+    """(material, error): the stored research for research_id, else the material passed in."""
+    if research_id:
+        stored = artifacts.get(research_id)
+        if stored is not None:
+            return ResearchResult.from_dict(stored).material(), None
+        if not research_material:
+            return None, f"No research found for research_id {research_id!r}; call research again or pass research_material."
+    return research_material, None
@@ -0,0 +1,229 @@
+import os
+import json
+import asyncio
+import time
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# when set, spans are recorded and exported here at the end of each run
+TRACE_DIR = os.getenv("TRACE_DIR", "")
+
+_lock = threading.Lock()
+_spans = []
+_stack = contextvars.ContextVar("span_stack", default=())
+_epoch = time.perf_counter_ns()
+# per-span counters aggregated in the OpenMetrics dump
+COUNTERS = ("prompt_tokens", "completion_tokens", "payload_bytes")
+
+
+def enabled():
+    return bool(TRACE_DIR)
+
+
+def size(value):
+    """Approximate payload size in bytes of a tool result or agent reply."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, str)):
+        return len(value.encode("utf-8") if isinstance(value, str) else value)
+    return len(json.dumps(value, default=str))
+
+
+@contextmanager
+def span(name, category, **args):
+    """Record a timed span; yields its args dict so the caller can attach results."""
+    if not enabled():
+        yield args
+        return
+    token = _stack.set(_stack.get() + (args,))
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        duration = time.perf_counter_ns() - start
+        _stack.reset(token)
+        with _lock:
+            _spans.append({
+                "name": name,
+                "cat": category,
+                "ts": (start - _epoch) / 1000,
+                "dur": duration / 1000,
+                "tid": threading.get_ident(),
+                "args": args,
+            })
+
+
+def annotate(**args):
+    """Set attributes (e.g. cache status) on the innermost open span."""
+    stack = _stack.get()
+    if stack:
+        stack[-1].update(args)
+
+
+def count(**deltas):
+    """Add counters (e.g. tokens) to every open span, so parents carry their children's totals."""
+    # parents are shared by the threads their children run on (fan_out, pipeline stages, summary map)
+    with _lock:
+        for args in _stack.get():
+            for key, value in deltas.items():
+                args[key] = args.get(key, 0) + value
+
+
+def traced(name, category="tool"):
+    """Decorator recording a span around a tool function, with the size of its result."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def a_wrapper(*args, **kwargs):
+                with span(name, category) as attrs:
+                    result = await fn(*args, **kwargs)
+                    attrs["payload_bytes"] = size(result)
+                    return result
+            return a_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, category) as attrs:
+                result = fn(*args, **kwargs)
+                attrs["payload_bytes"] = size(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def bind(fn):
+    """fn bound to a copy of the current context, so spans it opens on another thread nest under ours.
+
+    Call once per submitted task: a context can only be entered by one thread at a time.
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+async def _a_generate_oai_reply(self, messages=None, sender=None, config=None):
+    # autogen's version runs generate_oai_reply in the default executor without the caller's context
+    return await asyncio.get_running_loop().run_in_executor(
+        None, bind(functools.partial(self.generate_oai_reply, messages=messages, sender=sender, config=config)))
+
+
+def install():
+    """Keep async agents' LLM spans and token counts under their reply spans; call before building agents."""
+    from autogen import ConversableAgent
+    ConversableAgent.a_generate_oai_reply = _a_generate_oai_reply
+
+
+def instrument_agent(agent):
+    """Wrap an agent's generate_reply (sync and async) in a span per reply."""
+    reply, a_reply = agent.generate_reply, agent.a_generate_reply
+
+    def generate_reply(*args, **kwargs):
+        with span(f"reply:{agent.name}", "agent", agent=agent.name) as attrs:
+            result = reply(*args, **kwargs)
+            attrs["payload_bytes"] = size(result)
+            return result
+
+    async def a_generate_reply(*args, **kwargs):
+        with span(f"reply:{agent.name}", "agent", agent=agent.name) as attrs:
+            result = await a_reply(*args, **kwargs)
+            attrs["payload_bytes"] = size(result)
+            return result
+
+    agent.generate_reply = generate_reply
+    agent.a_generate_reply = a_generate_reply
+    return agent
+
+
+def instrument_groupchat(groupchat):
+    """Trace speaker selection and every participant's replies.
+
+    Call before building the GroupChatManager: it keeps its own copy of the groupchat.
+    """
+    select, a_select = groupchat.select_speaker, groupchat.a_select_speaker
+
+    def select_speaker(*args, **kwargs):
+        with span("select_speaker", "manager") as attrs:
+            speaker = select(*args, **kwargs)
+            attrs["speaker"] = speaker.name
+            return speaker
+
+    async def a_select_speaker(*args, **kwargs):
+        with span("select_speaker", "manager") as attrs:
+            speaker = await a_select(*args, **kwargs)
+            attrs["speaker"] = speaker.name
+            return speaker
+
+    groupchat.select_speaker = select_speaker
+    groupchat.a_select_speaker = a_select_speaker
+    for agent in groupchat.agents:
+        instrument_agent(agent)
+    return groupchat
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def chrome_trace():
+    """Spans as Chrome trace-event JSON (load in chrome://tracing or Perfetto)."""
+    pid = os.getpid()
+    return {"traceEvents": [
+        {"name": s["name"], "cat": s["cat"], "ph": "X", "ts": s["ts"], "dur": s["dur"],
+         "pid": pid, "tid": s["tid"], "args": s["args"]}
+        for s in spans()
+    ], "displayTimeUnit": "ms"}
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels.items())
+
+
+def openmetrics():
+    """Per-span aggregates in the OpenMetrics text format."""
+    totals = {}
+    for s in spans():
+        key = (s["cat"], s["name"])
+        total = totals.setdefault(key, {"count": 0, "seconds": 0.0, **{c: 0 for c in COUNTERS}, "cache": {}})
+        total["count"] += 1
+        total["seconds"] += s["dur"] / 1e6
+        for counter in COUNTERS:
+            total[counter] += s["args"].get(counter, 0)
+        if "cache" in s["args"]:
+            total["cache"][s["args"]["cache"]] = total["cache"].get(s["args"]["cache"], 0) + 1
+
+    lines = ["# TYPE agency_span_seconds summary", "# UNIT agency_span_seconds seconds"]
+    for (cat, name), t in sorted(totals.items()):
+        labels = _labels(category=cat, name=name)
+        lines.append(f"agency_span_seconds_count{{{labels}}} {t['count']}")
+        lines.append(f"agency_span_seconds_sum{{{labels}}} {t['seconds']:.6f}")
+    for counter in COUNTERS:
+        lines.append(f"# TYPE agency_{counter} counter")
+        for (cat, name), t in sorted(totals.items()):
+            if t[counter]:
+                lines.append(f"agency_{counter}_total{{{_labels(category=cat, name=name)}}} {t[counter]}")
+    lines.append("# TYPE agency_cache_lookups counter")
+    for (cat, name), t in sorted(totals.items()):
+        for status, n in sorted(t["cache"].items()):
+            lines.append(f"agency_cache_lookups_total{{{_labels(category=cat, name=name, status=status)}}} {n}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def export(directory=None, prefix="trace"):
+    """Write <prefix>.json (Chrome trace) and <prefix>.metrics (OpenMetrics); returns both paths."""
+    directory = directory or TRACE_DIR
+    os.makedirs(directory, exist_ok=True)
+    trace_path = os.path.join(directory, f"{prefix}.json")
+    metrics_path = os.path.join(directory, f"{prefix}.metrics")
+    with open(trace_path, "w") as file:
+        json.dump(chrome_trace(), file)
+    with open(metrics_path, "w") as file:
+        file.write(openmetrics())
+    return trace_path, metrics_path
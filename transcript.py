@@ -0,0 +1,170 @@
+import os
+import json
+import gzip
+import time
+import queue
+import shutil
+import threading
+from cache import CACHE_DIR
+
+# where transcripts go unless the caller passes a directory (batch uses each brief's run directory)
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", os.path.join(CACHE_DIR, "transcripts"))
+# a part is rotated once it would grow past this, and compressed when TRANSCRIPT_COMPRESS is gzip
+TRANSCRIPT_MAX_BYTES = int(os.getenv("TRANSCRIPT_MAX_BYTES", 8 * 1024 * 1024))
+TRANSCRIPT_COMPRESS = os.getenv("TRANSCRIPT_COMPRESS", "gzip")
+# the writer thread flushes after this many messages or seconds, whichever comes first
+TRANSCRIPT_BATCH = int(os.getenv("TRANSCRIPT_BATCH", 128))
+TRANSCRIPT_FLUSH_SECONDS = float(os.getenv("TRANSCRIPT_FLUSH_SECONDS", 0.5))
+
+_CLOSE = object()
+
+
+def _part_path(base, part):
+    return f"{base}.{part:03d}.md"
+
+
+def read_round(base, n):
+    """The markdown of round `n` of the transcript at `base`, read through its index; None if absent.
+
+    Only the one record is read: the index gives its part and byte range, and
+    rotated parts that were compressed are read with a gzip seek.
+    """
+    entry = None
+    with open(f"{base}.index.jsonl") as file:
+        for line in file:
+            item = json.loads(line)
+            if item["round"] == n:
+                entry = item
+                break
+    if entry is None:
+        return None
+    path = _part_path(base, entry["part"])
+    opener = open
+    if not os.path.exists(path):
+        path, opener = path + ".gz", gzip.open
+    with opener(path, "rb") as file:
+        file.seek(entry["offset"])
+        return file.read(entry["length"]).decode("utf-8")
+
+
+class TranscriptWriter:
+    """One run's transcript, written by a background thread in batches.
+
+    write() only queues the message. The thread appends records to
+    `<run_id>.NNN.md` parts, rotating past `max_bytes` (and gzipping finished
+    parts), and records each round's part and byte range in
+    `<run_id>.index.jsonl` so read() can fetch one round without scanning the log.
+    """
+
+    def __init__(self, run_id, directory, max_bytes=TRANSCRIPT_MAX_BYTES, compress=TRANSCRIPT_COMPRESS,
+                 batch=TRANSCRIPT_BATCH, flush_seconds=TRANSCRIPT_FLUSH_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self.base = os.path.join(directory, run_id)
+        self.max_bytes = max_bytes
+        self.compress = compress == "gzip"
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+        self.rounds = 0
+        self.parts = 1
+        self.flushes = 0
+        self.bytes = 0
+        self._part = 0
+        self._size = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._file = open(_part_path(self.base, 0), "ab")
+        self._index = open(f"{self.base}.index.jsonl", "a")
+        self._thread = threading.Thread(target=self._run, name=f"transcript-{run_id}", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        """Queue a chat message; returns its round number."""
+        with self._lock:
+            if self._closed:
+                raise ValueError("transcript is closed")
+            self.rounds += 1
+            n = self.rounds
+        self._queue.put((n, message.get("name") or message.get("role") or "", message.get("content") or ""))
+        return n
+
+    def flush(self):
+        """Block until every queued message is on disk."""
+        self._queue.join()
+
+    def read(self, n):
+        self.flush()
+        return read_round(self.base, n)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        pending, closing = [], False
+        while not closing:
+            deadline = time.monotonic() + self.flush_seconds
+            while len(pending) < self.batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    self._queue.task_done()
+                    break
+                pending.append(item)
+            if pending:
+                try:
+                    self._flush(pending)
+                except OSError as e:
+                    # a lost batch must not stop the chat, nor leave flush() waiting forever
+                    print(f"Transcript write to {self.base} failed: {e}")
+                for _ in pending:
+                    self._queue.task_done()
+                pending = []
+        self._file.close()
+        self._index.close()
+        if self.compress and self._size:
+            self._compress(self._part)
+
+    def _flush(self, records):
+        index = []
+        for n, name, content in records:
+            data = f"### {n}. {name}\n\n{content}\n\n".encode("utf-8")
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            index.append(json.dumps({"round": n, "name": name, "part": self._part,
+                                     "offset": self._size, "length": len(data)}) + "\n")
+            self._size += len(data)
+            self.bytes += len(data)
+        self._file.flush()
+        # the index only ever points at bytes that are already written
+        self._index.writelines(index)
+        self._index.flush()
+        self.flushes += 1
+
+    def _rotate(self):
+        self._file.close()
+        if self.compress:
+            self._compress(self._part)
+        self._part += 1
+        self.parts += 1
+        self._size = 0
+        self._file = open(_part_path(self.base, self._part), "ab")
+
+    def _compress(self, part):
+        path = _part_path(self.base, part)
+        with open(path, "rb") as source, gzip.open(path + ".gz.tmp", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(path + ".gz.tmp", path + ".gz")
+        os.remove(path)
+
+    def report(self):
+        return (f"Transcript: {self.rounds} messages, {self.bytes / 1024:.0f} KiB in {self.parts} parts, "
+                f"{self.flushes} flushes -> {self.base}.*")
@@ -0,0 +1,28 @@
+import re
+import zlib
+import numpy as np
+
+STOPWORDS = set("""a an and are as at be by for from has have in is it its of on or our that the their
+this to was we will with you your all any can not no into than then them they these those
+""".split())
+_SUFFIXES = ("ings", "ing", "ers", "er", "ies", "es", "s", "ed", "ic", "al")
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def vectorize(texts, dimensions=2048):
+    """L2-normalized hashed bag-of-words vectors (one row per text) with sublinear term counts."""
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [_stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+        if words:
+            buckets = np.fromiter((zlib.crc32(w.encode()) % dimensions for w in words), dtype=np.int64)
+            np.add.at(matrix[row], buckets, 1.0)
+    np.log1p(matrix, out=matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)